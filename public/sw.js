@@ -1,6 +1,11 @@
 /* global clients */
 const CACHE_NAME = 'meditaciones-v1';
+// El corpus se guarda aparte, con su versión, para actualizarlo con parches
+const CORPUS_CACHE = 'meditaciones-corpus';
 const BASE_PATH = '/EstoicApp/';
+const CORPUS_URL = BASE_PATH + 'data/meditations.json';
+const MANIFEST_URL = BASE_PATH + 'data/manifest.json';
+const VERSION_HEADER = 'X-Corpus-Version';
 
 // Archivos a cachear para funcionamiento offline
 const urlsToCache = [
@@ -27,7 +32,7 @@ self.addEventListener('activate', (event) => {
     caches.keys().then((cacheNames) => {
       return Promise.all(
         cacheNames.map((cacheName) => {
-          if (cacheName !== CACHE_NAME) {
+          if (cacheName !== CACHE_NAME && cacheName !== CORPUS_CACHE) {
             console.log('Eliminando cache antiguo:', cacheName);
             return caches.delete(cacheName);
           }
@@ -37,8 +42,20 @@ self.addEventListener('activate', (event) => {
   );
 });
 
-// Estrategia de cache: Network first, fallback to cache
+// Estrategia de cache: Network first, fallback to cache. El corpus completo
+// va por getCorpus: sólo se descargan las meditaciones que cambiaron.
 self.addEventListener('fetch', (event) => {
+  if (new URL(event.request.url).pathname === CORPUS_URL) {
+    event.respondWith(
+      getCorpus()
+        .then((corpus) => new Response(JSON.stringify(corpus), {
+          headers: { 'Content-Type': 'application/json' }
+        }))
+        // Sin corpus en cache ni red, como el resto de peticiones
+        .catch(() => caches.match(event.request))
+    );
+    return;
+  }
   event.respondWith(
     fetch(event.request)
       .then((response) => {
@@ -59,6 +76,84 @@ self.addEventListener('fetch', (event) => {
   );
 });
 
+// Aplica un parche de versiones (data/patches/<origen>-<destino>.json,
+// generado por scripts/corpus_versions.py) al corpus completo de la versión
+// de origen. Equivale a apply_patch en Python.
+function applyCorpusPatch(corpus, patch) {
+  const removed = new Set(patch.removed);
+  const rows = new Map();
+  for (const meditation of corpus.meditations) {
+    if (!removed.has(meditation.id)) rows.set(meditation.id, meditation);
+  }
+  for (const meditation of patch.changed.concat(patch.added)) {
+    rows.set(meditation.id, meditation);
+  }
+  const order = patch.order || [...rows.keys()].sort((a, b) => a - b);
+  const header = patch.header
+    || Object.fromEntries(Object.entries(corpus).filter(([key]) => key !== 'meditations'));
+  return { ...header, meditations: order.map((id) => rows.get(id)) };
+}
+
+// Versión de un corpus: los 12 primeros dígitos hex del SHA-256 del JSON
+// minificado, como "version" en data/manifest.json
+async function corpusVersion(corpus) {
+  const bytes = new TextEncoder().encode(JSON.stringify(corpus));
+  const digest = await crypto.subtle.digest('SHA-256', bytes);
+  return [...new Uint8Array(digest)]
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('')
+    .slice(0, 12);
+}
+
+// Corpus completo al día. Con una versión en cache se pide sólo el manifiesto
+// (unos KB) y, si hay versión nueva, el parche desde la nuestra; el corpus
+// entero se descarga si no hay parche o si el resultado no coincide con la
+// versión publicada. Sin red, o si falla la descarga, se usa la copia en cache.
+async function getCorpus() {
+  const cache = await caches.open(CORPUS_CACHE);
+  const cached = await cache.match(CORPUS_URL);
+  const cachedVersion = cached && cached.headers.get(VERSION_HEADER);
+
+  let manifest;
+  try {
+    const response = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+    if (!response.ok) throw new Error(`manifest: HTTP ${response.status}`);
+    manifest = await response.json();
+  } catch (error) {
+    if (cached) return cached.json();
+    throw error;
+  }
+  if (cached && cachedVersion === manifest.version) return cached.json();
+
+  let corpus = null;
+  const patchFile = cached && manifest.patches && manifest.patches[cachedVersion];
+  if (patchFile) {
+    try {
+      const response = await fetch(BASE_PATH + 'data/' + patchFile);
+      if (!response.ok) throw new Error(`${patchFile}: HTTP ${response.status}`);
+      corpus = applyCorpusPatch(await cached.clone().json(), await response.json());
+      if (await corpusVersion(corpus) !== manifest.version) corpus = null;
+    } catch {
+      corpus = null;
+    }
+  }
+  if (!corpus) {
+    try {
+      const response = await fetch(CORPUS_URL, { cache: 'no-cache' });
+      if (!response.ok) throw new Error(`corpus: HTTP ${response.status}`);
+      corpus = await response.json();
+    } catch (error) {
+      if (cached) return cached.json();
+      throw error;
+    }
+  }
+
+  await cache.put(CORPUS_URL, new Response(JSON.stringify(corpus), {
+    headers: { 'Content-Type': 'application/json', [VERSION_HEADER]: manifest.version }
+  }));
+  return corpus;
+}
+
 // Función para obtener la meditación del día
 function getDailyMeditation(meditations) {
   const today = new Date();
@@ -76,19 +171,40 @@ function getDailyMeditation(meditations) {
   return meditations[index];
 }
 
+// Texto de la notificación (recortado a 150 caracteres)
+function notificationBody(text) {
+  return text.length > 150
+    ? text.substring(0, 147) + '...'
+    : text;
+}
+
+// Meditación del día desde el calendario precalculado (data/daily/AAAA-MM.json,
+// generado por scripts/build_public_data.py con la misma selección que
+// getDailyMeditation). Devuelve null si el mes no está en el calendario.
+async function getScheduledMeditation() {
+  const today = new Date();
+  const month = String(today.getMonth() + 1).padStart(2, '0');
+  const response = await fetch(`${BASE_PATH}data/daily/${today.getFullYear()}-${month}.json`);
+  if (!response.ok) return null;
+  const schedule = await response.json();
+  const entry = schedule.days[today.getDate() - 1];
+  return entry ? { id: entry[0], body: entry[1] } : null;
+}
+
 // Mostrar notificación de meditación
 async function showMeditationNotification() {
   try {
-    // Intentar obtener las meditaciones del cache o de la red
-    const response = await fetch(BASE_PATH + 'data/meditations.json');
-    const data = await response.json();
-    const meditation = getDailyMeditation(data.meditations);
+    // Primero el calendario del mes (unos KB); si falta, el corpus completo
+    let daily = await getScheduledMeditation().catch(() => null);
+    if (!daily) {
+      const data = await getCorpus();
+      const meditation = getDailyMeditation(data.meditations);
+      daily = { id: meditation.id, body: notificationBody(meditation.text) };
+    }
 
     const title = 'Meditación del Día';
     const options = {
-      body: meditation.text.length > 150
-        ? meditation.text.substring(0, 147) + '...'
-        : meditation.text,
+      body: daily.body,
       icon: BASE_PATH + 'icons/icon-192.png',
       badge: BASE_PATH + 'icons/icon-72.png',
       tag: 'daily-meditation',
@@ -96,7 +212,7 @@ async function showMeditationNotification() {
       requireInteraction: false,
       data: {
         url: BASE_PATH,
-        meditationId: meditation.id
+        meditationId: daily.id
       },
       actions: [
         {
@@ -2,11 +2,22 @@
 """
 Script para asignar temas a las meditaciones basándose en palabras clave.
 """
+import argparse
 import json
 import re
+import time
 from pathlib import Path
 from collections import Counter
 
+import profiling
+from profiling import PROFILER
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # solo hacen falta para --batch
+    np = sparse = None
+
 # Definición de temas con sus palabras clave asociadas
 THEME_KEYWORDS = {
     "virtue": [
@@ -94,31 +105,84 @@ THEME_KEYWORDS = {
     ]
 }
 
-# Compilar patrones regex para cada tema (más eficiente)
+# Compilar patrones regex para cada tema. Ya no se usan para asignar temas
+# (ver THEME_INDEX), pero se conservan como referencia para --benchmark.
 THEME_PATTERNS = {}
 for theme, keywords in THEME_KEYWORDS.items():
     # Crear patrón que busque palabras completas
     pattern = r'\b(' + '|'.join(re.escape(kw) for kw in keywords) + r')\b'
     THEME_PATTERNS[theme] = re.compile(pattern, re.IGNORECASE)
 
+# Índice único para todos los temas: primera palabra de la palabra clave ->
+# [(palabras, palabra clave, {tema: posición en la lista del tema})].
+# Las palabras clave son palabras completas (\b...\b) separadas por un único
+# espacio, así que basta con tokenizar el texto una vez y buscar cada token
+# en el diccionario.
+WORD_RE = re.compile(r'\w+')
+THEME_INDEX = {}
+for theme, keywords in THEME_KEYWORDS.items():
+    for rank, keyword in enumerate(keywords):
+        words = tuple(keyword.split(' '))
+        entries = THEME_INDEX.setdefault(words[0], [])
+        entry = next((e for e in entries if e[1] == keyword), None)
+        if entry is None:
+            entry = (words, keyword, {})
+            entries.append(entry)
+        entry[2].setdefault(theme, rank)
 
-def assign_themes(text: str, max_themes: int = 3) -> list:
+
+def theme_keyword_matches(text: str) -> dict:
     """
-    Asigna temas a una meditación basándose en las palabras clave encontradas.
-    Retorna hasta max_themes temas ordenados por relevancia.
+    Busca en una sola pasada las coincidencias de todos los temas.
+    Retorna {tema: [palabras clave coincidentes]} en el orden de
+    THEME_KEYWORDS, con los mismos resultados que findall tema a tema.
     """
     text_lower = text.lower()
-    theme_scores = {}
+    tokens = [(m.start(), m.end(), m.group()) for m in WORD_RE.finditer(text_lower)]
+    # Por tema: índice del primer token que su regex aún no ha consumido
+    next_free = {}
+    matches = {}
 
-    for theme, pattern in THEME_PATTERNS.items():
-        matches = pattern.findall(text_lower)
-        if matches:
-            # Puntuación basada en número de coincidencias únicas y totales
-            unique_matches = len(set(matches))
-            total_matches = len(matches)
-            # Dar más peso a palabras únicas que a repeticiones
-            theme_scores[theme] = unique_matches * 2 + total_matches
+    for i, (_, _, word) in enumerate(tokens):
+        entries = THEME_INDEX.get(word)
+        if not entries:
+            continue
+        best = {}
+        for words, keyword, ranks in entries:
+            n = len(words)
+            if n > 1:
+                if i + n > len(tokens):
+                    continue
+                if any(
+                    tokens[i + k][2] != words[k] or text_lower[tokens[i + k - 1][1]:tokens[i + k][0]] != ' '
+                    for k in range(1, n)
+                ):
+                    continue
+            for theme, rank in ranks.items():
+                if next_free.get(theme, 0) <= i and (theme not in best or rank < best[theme][0]):
+                    best[theme] = (rank, keyword, n)
+        # Como la alternancia de cada regex, gana la primera palabra clave de
+        # la lista del tema que coincide en esta posición
+        for theme, (_, keyword, n) in best.items():
+            matches.setdefault(theme, []).append(keyword)
+            next_free[theme] = i + n
 
+    return {theme: matches[theme] for theme in THEME_KEYWORDS if theme in matches}
+
+
+def theme_keyword_counts(text: str) -> dict:
+    """
+    Cuenta en una sola pasada las coincidencias de todos los temas.
+    Retorna {tema: (palabras clave únicas, coincidencias totales)}.
+    """
+    return {
+        theme: (len(set(found)), len(found))
+        for theme, found in theme_keyword_matches(text).items()
+    }
+
+
+def rank_themes(theme_scores: dict, max_themes: int = 3) -> list:
+    """Elige hasta max_themes temas a partir de sus puntuaciones."""
     # Ordenar por puntuación y tomar los mejores
     sorted_themes = sorted(theme_scores.items(), key=lambda x: x[1], reverse=True)
 
@@ -139,7 +203,182 @@ def assign_themes(text: str, max_themes: int = 3) -> list:
     return result
 
 
+def assign_themes(text: str, max_themes: int = 3) -> list:
+    """
+    Asigna temas a una meditación basándose en las palabras clave encontradas.
+    Retorna hasta max_themes temas ordenados por relevancia.
+    """
+    # Puntuación basada en número de coincidencias únicas y totales;
+    # dar más peso a palabras únicas que a repeticiones
+    theme_scores = {
+        theme: unique * 2 + total
+        for theme, (unique, total) in theme_keyword_counts(text).items()
+    }
+    return rank_themes(theme_scores, max_themes)
+
+
+def assign_themes_reference(text: str, max_themes: int = 3) -> list:
+    """Implementación original: un findall por tema sobre THEME_PATTERNS."""
+    text_lower = text.lower()
+    theme_scores = {}
+
+    for theme, pattern in THEME_PATTERNS.items():
+        matches = pattern.findall(text_lower)
+        if matches:
+            unique_matches = len(set(matches))
+            total_matches = len(matches)
+            theme_scores[theme] = unique_matches * 2 + total_matches
+
+    return rank_themes(theme_scores, max_themes)
+
+
+# Columnas de la matriz término-documento: un par (tema, palabra clave) por
+# columna, para respetar que cada regex de tema consume sus coincidencias
+THEME_COLUMNS = [(theme, kw) for theme, keywords in THEME_KEYWORDS.items() for kw in keywords]
+COLUMN_INDEX = {column: i for i, column in enumerate(THEME_COLUMNS)}
+THEME_IDS = list(THEME_KEYWORDS)
+
+
+def keyword_matrix(texts: list):
+    """Matriz dispersa (textos x THEME_COLUMNS) con el número de coincidencias."""
+    rows, cols, counts = [], [], []
+    for row, text in enumerate(texts):
+        for theme, found in theme_keyword_matches(text).items():
+            for keyword, count in Counter(found).items():
+                rows.append(row)
+                cols.append(COLUMN_INDEX[(theme, keyword)])
+                counts.append(count)
+    return sparse.csr_matrix(
+        (np.array(counts, dtype=np.float64), (rows, cols)),
+        shape=(len(texts), len(THEME_COLUMNS)),
+    )
+
+
+def theme_matrix():
+    """Matriz dispersa (THEME_COLUMNS x temas) que suma cada columna en su tema."""
+    cols = [THEME_IDS.index(theme) for theme, _ in THEME_COLUMNS]
+    return sparse.csr_matrix(
+        (np.ones(len(cols)), (range(len(cols)), cols)),
+        shape=(len(THEME_COLUMNS), len(THEME_IDS)),
+    )
+
+
+def batch_theme_scores(texts: list):
+    """
+    Puntúa todos los textos a la vez. Retorna dos matrices (textos x temas):
+    la puntuación heurística de assign_themes (únicas*2 + totales) y la
+    confianza TF-IDF de cada tema, normalizada para que cada fila sume 1.
+    """
+    counts = keyword_matrix(texts)
+    themes = theme_matrix()
+
+    # únicas*2 + totales == suma por palabra clave de (2 + coincidencias)
+    heuristic = counts.copy()
+    heuristic.data += 2
+    heuristic = (heuristic @ themes).toarray()
+
+    # TF sublineal, IDF suavizado y normalización L2 por texto
+    tfidf = counts.copy()
+    tfidf.data = 1 + np.log(tfidf.data)
+    doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + counts.shape[0]) / (1 + doc_freq)) + 1
+    tfidf = tfidf @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    tfidf = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ tfidf
+
+    scores = (tfidf @ themes).toarray()
+    totals = scores.sum(axis=1, keepdims=True)
+    confidence = scores / np.where(totals > 0, totals, 1)
+    return heuristic, confidence
+
+
+def assign_themes_batch(meditations: list, max_themes: int = 3) -> None:
+    """
+    Asigna temas a todas las meditaciones con una sola multiplicación de
+    matrices y guarda la confianza por tema en meditation['themeScores'].
+    Los temas elegidos son los mismos que con assign_themes.
+    """
+    if np is None:
+        raise SystemExit("ERROR: --batch requiere numpy y scipy (pip install numpy scipy)")
+
+    heuristic, confidence = batch_theme_scores([m['text'] for m in meditations])
+    for meditation, scores, weights in zip(meditations, heuristic, confidence):
+        theme_scores = {theme: int(score) for theme, score in zip(THEME_IDS, scores) if score}
+        meditation['themes'] = rank_themes(theme_scores, max_themes)
+        meditation['themeScores'] = {
+            theme: round(float(weight), 3)
+            for weight, theme in sorted(zip(weights, THEME_IDS), key=lambda x: -x[0])
+            if weight >= 0.0005
+        }
+
+
+def apply_themes(meditations: list, batch: bool = False) -> None:
+    """Asigna temas a todas las meditaciones (en lote con --batch)."""
+    if batch:
+        with PROFILER.stage('batch'):
+            assign_themes_batch(meditations)
+    elif PROFILER.enabled:
+        # Con --profile: llamadas, tiempo y temas asignados (como "hits")
+        hits, timings, calls = PROFILER.rules('themes')
+        for meditation in meditations:
+            started = time.perf_counter()
+            meditation['themes'] = assign_themes(meditation['text'])
+            timings['assign_themes'] += time.perf_counter() - started
+            calls['assign_themes'] += 1
+            hits['assign_themes'] += len(meditation['themes'])
+    else:
+        for meditation in meditations:
+            meditation['themes'] = assign_themes(meditation['text'])
+
+
+def benchmark(meditations: list, size: int) -> bool:
+    """
+    Compara assign_themes con la implementación original sobre el corpus
+    replicado hasta size pasajes. Retorna True si los temas coinciden.
+    """
+    texts = [m['text'] for m in meditations]
+    texts = (texts * (size // len(texts) + 1))[:size]
+    print(f"Benchmark sobre {len(texts)} pasajes ({sum(map(len, texts)) / 1e6:.1f} MB de texto)")
+
+    results = {}
+    for label, func in (("referencia", assign_themes_reference), ("índice único", assign_themes)):
+        started = time.perf_counter()
+        results[label] = [func(text) for text in texts]
+        elapsed = time.perf_counter() - started
+        print(f"  {label:13s}: {elapsed:7.2f}s  ({len(texts) / elapsed:,.0f} pasajes/s)")
+
+    if np is not None:
+        batch = [{'text': text} for text in texts]
+        started = time.perf_counter()
+        assign_themes_batch(batch)
+        elapsed = time.perf_counter() - started
+        results["matriz"] = [m['themes'] for m in batch]
+        print(f"  {'matriz':13s}: {elapsed:7.2f}s  ({len(texts) / elapsed:,.0f} pasajes/s)")
+
+    identical = all(themes == results["referencia"] for themes in results.values())
+    print(f"  Temas idénticos: {'sí' if identical else 'NO'}")
+    return identical
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Asigna temas a las meditaciones por palabras clave.")
+    parser.add_argument(
+        "--benchmark", type=int, metavar="N", nargs="?", const=100_000,
+        help="compara con la implementación original sobre el corpus replicado a N pasajes "
+             "(por defecto 100000) sin modificar el JSON",
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="puntúa todo el corpus con una matriz término-documento (numpy/scipy) y "
+             "guarda la confianza TF-IDF de cada tema en themeScores",
+    )
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    profiling.start_from(args, "assign_themes")
     script_dir = Path(__file__).parent
     project_dir = script_dir.parent
     input_path = project_dir / "src" / "data" / "meditations.json"
@@ -152,13 +391,20 @@ def main():
     meditations = data['meditations']
     print(f"Total de meditaciones: {len(meditations)}")
 
+    if args.benchmark:
+        if not benchmark(meditations, args.benchmark):
+            raise SystemExit("ERROR: los temas difieren de la implementación original")
+        return
+
     # Asignar temas a cada meditación
     theme_counts = Counter()
     meditations_without_themes = 0
 
+    with PROFILER.stage('themes'):
+        apply_themes(meditations, args.batch)
+
     for meditation in meditations:
-        themes = assign_themes(meditation['text'])
-        meditation['themes'] = themes
+        themes = meditation['themes']
 
         for theme in themes:
             theme_counts[theme] += 1
@@ -187,7 +433,7 @@ def main():
         print(f"  {num_themes} tema(s): {count} meditaciones")
 
     # Guardar resultado
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with PROFILER.stage('write'), open(output_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
     print(f"\nJSON actualizado guardado en: {output_path}")
@@ -3,45 +3,517 @@
 
 This is intentionally conservative: it does not rewrite the corpus. It prints
 candidate rows so manual cleanup can focus on the worst reading problems first.
+
+All checks run on each row in a single traversal of the corpus (optionally
+spread over worker processes with --jobs). Complete results can be written as
+JSONL, one record per (row, check) with the matched span offsets and one per
+near-duplicate pair, told apart by their "kind" ("row" or "pair"), plus a
+JSON summary, so CI and dashboards don't need to scrape the text report.
+
+Besides the per-row checks, the audit compares rows with each other to catch
+passages that chapter splitting duplicated, merged or cut across chapters:
+each row is shingled into word 3-grams, summarised by a MinHash signature,
+and LSH banding over the signatures yields candidate pairs in roughly linear
+time (no all-pairs comparison). Candidates whose Jaccard similarity or
+containment (share of the shorter passage found in the other) is high are
+reported with both and with the MinHash estimate.
+
+Each run stores a baseline with a content hash, the hits and the MinHash
+signature of every row, and the pairs. With --changed only rows whose text
+changed (and checks whose definition changed) are audited again and
+shingled and hashed for the pairs; banding and the exact comparison of the
+candidates still run over the whole corpus, which is cheap. Hits and pairs
+introduced or resolved since the baseline are reported.
 """
 from __future__ import annotations
 
+import argparse
+import base64
+import hashlib
 import json
 import re
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # optional: without it the near-duplicate pairs are skipped
+    np = None
+
+import profiling
+from ocr_rules import audit_patterns, load_ocr_rules
+from profiling import PROFILER
+
 ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+BASELINE_PATH = ROOT / ".cache" / "audit_baseline.json"
+BASELINE_VERSION = 3
+
+LONG_PASSAGE_CHARS = 1200
+REPORT_LIMIT = 12
+
+SHINGLE_WORDS = 3
+MINHASH_PERMUTATIONS = 128
+# 64 bands of 2 rows: pairs with Jaccard >= ~0.125 become candidates, low
+# enough to catch a short passage repeated inside a long one
+LSH_BANDS = 64
+MINHASH_SEED = 20240601
+MERSENNE_PRIME = (1 << 31) - 1
+MINHASH_BLOCK_SHINGLES = 1 << 16
+NEAR_DUPLICATE_JACCARD = 0.5
+OVERLAP_CONTAINMENT = 0.8
+MIN_OVERLAP_SHINGLES = 8
+WORD_TOKEN_RE = re.compile(r"\w+")
+PAIR_CHECKS = ("near_duplicate", "overlap")
+
+
+def _pattern_check(*patterns: re.Pattern):
+    """Build a check returning the sorted (start, end) spans of all patterns."""
+    return lambda text: sorted((m.start(), m.end()) for pattern in patterns for m in pattern.finditer(text))
 
+
+# Each check maps a text to the list of (start, end) spans it flags; an empty
+# list means the row is clean for that check. The OCR checks come from the
+# rules in ocr_rules.json that carry an "audit" key.
 CHECKS = {
-    "long_passage": lambda text: len(text) > 1200,
-    "ocr_glued_case": lambda text: bool(re.search(r"[a-záéíóúñ][A-ZÁÉÍÓÚÑ]", text)),
-    "orphan_footnote_mark": lambda text: bool(re.search(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+'(?=[:\s])|\s'\s", text)),
-    "known_ocr_tokens": lambda text: bool(
-        re.search(r"mimadree|unifonnidad|páados|deLinRo|espíritufamili", text, re.I)
-        or re.search(r"cuerpO", text)
-    ),
-    "page_digit_artifact": lambda text: bool(re.search(r"\s\d+\s+(?=misma|virtud|naturaleza|razón|vida|muerte|alma|cuerpo)", text, re.I)),
+    "long_passage": lambda text: [(LONG_PASSAGE_CHARS, len(text))] if len(text) > LONG_PASSAGE_CHARS else [],
+    "ocr_glued_case": _pattern_check(re.compile(r"[a-záéíóúñ][A-ZÁÉÍÓÚÑ]")),
+    **{name: _pattern_check(*patterns) for name, patterns in audit_patterns(load_ocr_rules()[1]).items()},
 }
 
 
-def load_rows() -> list[dict]:
-    with DATA_PATH.open(encoding="utf-8") as fh:
+def load_rows(path: Path = DATA_PATH) -> list[dict]:
+    with path.open(encoding="utf-8") as fh:
         return json.load(fh)["meditations"]
 
 
-def main() -> int:
-    rows = load_rows()
-    total_hits = 0
+def audit_row(row: dict, names: list[str] | None = None) -> list[dict]:
+    """Run the named checks (default: all) on one row; one hit record per flagged check."""
+    text = row.get("text", "")
+    hits = []
+    counters = PROFILER.rules("audit") if PROFILER.enabled else None
+    for name in names or CHECKS:
+        if counters is None:
+            spans = CHECKS[name](text)
+        else:
+            started = time.perf_counter()
+            spans = CHECKS[name](text)
+            counters.timings[name] += time.perf_counter() - started
+            counters.calls[name] += 1
+            counters.hits[name] += len(spans)
+        if spans:
+            hits.append({
+                "kind": "row",
+                "id": row["id"],
+                "book": row["book"],
+                "chapter": row["chapter"],
+                "check": name,
+                "spans": [list(span) for span in spans],
+            })
+    return hits
+
+
+def audit_rows(rows: list[dict], jobs: int = 1, names: list[str] | None = None) -> list[dict]:
+    """Audit all rows in one pass, keeping corpus order in the results."""
+    if jobs > 1 and len(rows) > 1:
+        chunksize = max(1, len(rows) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            per_row = list(pool.map(audit_row, rows, repeat(names), chunksize=chunksize))
+    else:
+        per_row = [audit_row(row, names) for row in rows]
+    return [hit for hits in per_row for hit in hits]
+
+
+def shingles(text: str) -> set[int]:
+    """CRC32 hashes of the word SHINGLE_WORDS-grams of a text (the whole text if shorter)."""
+    words = WORD_TOKEN_RE.findall(text.lower())
+    grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams if gram}
+
+
+def minhash_signatures(shingle_sets: list[set[int]], block_shingles: int = MINHASH_BLOCK_SHINGLES):
+    """(rows x MINHASH_PERMUTATIONS) signatures from random (a * x + b) mod p permutations.
+
+    Rows are hashed in blocks of about block_shingles shingles, so memory
+    stays bounded however large the corpus is.
+    """
+    rng = np.random.default_rng(MINHASH_SEED)
+    a = rng.integers(1, MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+    signatures = np.empty((len(shingle_sets), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    start = 0
+    while start < len(shingle_sets):
+        stop, size = start, 0
+        while stop < len(shingle_sets) and (stop == start or size + len(shingle_sets[stop]) <= block_shingles):
+            size += len(shingle_sets[stop])
+            stop += 1
+        block = shingle_sets[start:stop]
+        values = np.fromiter((x for row in block for x in row), dtype=np.uint64, count=size) % MERSENNE_PRIME
+        offsets = np.cumsum([0] + [len(row) for row in block[:-1]])
+        # permutations x shingles, so each row's minimum is a contiguous reduction
+        hashed = (a[:, None] * values + b[:, None]) % MERSENNE_PRIME
+        signatures[start:stop] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        start = stop
+    return signatures
+
+
+def lsh_candidates(signatures) -> set[tuple[int, int]]:
+    """Index pairs sharing all rows of at least one band."""
+    rows_per_band = signatures.shape[1] // LSH_BANDS
+    key_type = np.dtype((np.void, rows_per_band * signatures.dtype.itemsize))
+    candidates = set()
+    for band in range(LSH_BANDS):
+        chunk = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        keys = chunk.view(key_type).ravel()
+        # Sorting the band keys puts each bucket in a run; only runs longer
+        # than one row give pairs
+        order = np.argsort(keys, kind="stable")
+        starts = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1], True])
+        for first, last in zip(starts[:-1], starts[1:]):
+            if last - first > 1:
+                members = order[first:last].tolist()
+                candidates.update(
+                    (members[x], members[y]) for x in range(len(members)) for y in range(x + 1, len(members))
+                )
+    return candidates
+
+
+def near_duplicate_pairs(rows: list[dict], signatures: dict | None = None) -> list[dict]:
+    """Near-duplicate ("near_duplicate") and contained ("overlap") row pairs, most similar first.
+
+    signatures maps row ids to MinHash signatures (None for rows without
+    shingles) from an earlier run; rows missing from it are shingled and
+    hashed, and their signatures added to it.
+    """
+    if np is None:
+        return []
+    signatures = {} if signatures is None else signatures
+    row_shingles = {}
+    with PROFILER.stage("shingles"):
+        for row in rows:
+            if row["id"] not in signatures:
+                row_shingles[row["id"]] = shingles(row.get("text", ""))
+    with PROFILER.stage("minhash"):
+        fresh = [row_id for row_id, shingle_set in row_shingles.items() if shingle_set]
+        computed = minhash_signatures([row_shingles[row_id] for row_id in fresh]) if fresh else []
+        signatures.update({row_id: None for row_id in row_shingles})
+        signatures.update(zip(fresh, computed))
+    indexed = [row for row in rows if signatures[row["id"]] is not None]
+    if len(indexed) < 2:
+        return []
+    matrix = np.stack([signatures[row["id"]] for row in indexed])
+    with PROFILER.stage("lsh"):
+        candidates = lsh_candidates(matrix)
+
+    def shingles_of(row: dict) -> set[int]:
+        if row["id"] not in row_shingles:
+            row_shingles[row["id"]] = shingles(row.get("text", ""))
+        return row_shingles[row["id"]]
+
+    pairs = []
+    for i, j in sorted(candidates):
+        # Candidates are few, so their exact overlap is cheap; the MinHash
+        # estimate of a short passage inside a long one is too noisy to
+        # derive containment from
+        first_shingles, second_shingles = shingles_of(indexed[i]), shingles_of(indexed[j])
+        shared = len(first_shingles & second_shingles)
+        jaccard = shared / len(first_shingles | second_shingles)
+        smaller = min(len(first_shingles), len(second_shingles))
+        containment = shared / smaller
+        if jaccard >= NEAR_DUPLICATE_JACCARD:
+            check = "near_duplicate"
+        elif containment >= OVERLAP_CONTAINMENT and smaller >= MIN_OVERLAP_SHINGLES:
+            check = "overlap"
+        else:
+            continue
+        first, second = indexed[i], indexed[j]
+        pairs.append({
+            "kind": "pair",
+            "check": check,
+            "ids": [first["id"], second["id"]],
+            "rows": [{"id": row["id"], "book": row["book"], "chapter": row["chapter"]} for row in (first, second)],
+            "minhash": round(float(np.mean(matrix[i] == matrix[j])), 3),
+            "jaccard": round(jaccard, 3),
+            "containment": round(containment, 3),
+        })
+    return sorted(pairs, key=lambda pair: (-pair["jaccard"], -pair["containment"], pair["ids"]))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _code_parts(code) -> list[str]:
+    """Bytecode and constants of a code object, recursing into nested code."""
+    parts = [code.co_code.hex()]
+    for const in code.co_consts:
+        parts += _code_parts(const) if hasattr(const, "co_code") else [repr(const)]
+    return parts
+
+
+def _value_part(value) -> str:
+    """repr of a captured value, spelling out regexes (re.Pattern's repr is truncated)."""
+    if isinstance(value, re.Pattern):
+        return f"re.compile({value.pattern!r}, {value.flags})"
+    if isinstance(value, (tuple, list)):
+        return "(" + ", ".join(_value_part(item) for item in value) + ")"
+    return repr(value)
+
+
+def check_fingerprint(check) -> str:
+    """Hash a check's code, its captured patterns and the constants it reads."""
+    code = check.__code__
+    parts = _code_parts(code)
+    parts += [_value_part(cell.cell_contents) for cell in check.__closure__ or ()]
+    parts += [
+        repr(check.__globals__[name]) for name in code.co_names
+        if isinstance(check.__globals__.get(name), (int, float, str))
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def signature_fingerprint() -> str:
+    """Hash of the shingling and MinHash code and constants the stored signatures depend on."""
+    parts = check_fingerprint(shingles) + check_fingerprint(minhash_signatures)
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_signature(signature) -> str:
+    """A MinHash signature as base64 of its values (below MERSENNE_PRIME) as 32-bit integers."""
+    if signature is None:
+        return ""
+    return base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+
+def decode_signature(text: str):
+    if not text:
+        return None
+    return np.frombuffer(base64.b64decode(text), dtype="<u4").astype(np.uint64)
+
+
+def baseline_signatures(rows: list[dict], baseline: dict) -> dict:
+    """The baseline's MinHash signatures of the rows whose text hasn't changed."""
+    if baseline.get("minhash") != signature_fingerprint():
+        return {}
+    signatures = {}
+    for row in rows:
+        old = baseline["rows"].get(str(row["id"]))
+        if old is not None and "minhash" in old and old["hash"] == text_hash(row.get("text", "")):
+            signatures[row["id"]] = decode_signature(old["minhash"])
+    return signatures
+
+
+def load_baseline(path: Path) -> dict | None:
+    try:
+        baseline = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return baseline if baseline.get("version") == BASELINE_VERSION else None
+
+
+def save_baseline(path: Path, rows: list[dict], hits: list[dict], pairs: list[dict],
+                  signatures: dict | None = None) -> None:
+    """Write the baseline; rows missing from signatures (no numpy) are stored without one."""
+    signatures = signatures or {}
+    by_id: dict[str, list[dict]] = {}
+    for hit in hits:
+        by_id.setdefault(str(hit["id"]), []).append(hit)
+    stored = {}
+    for row in rows:
+        stored[str(row["id"])] = {"hash": text_hash(row.get("text", "")), "hits": by_id.get(str(row["id"]), [])}
+        if row["id"] in signatures:
+            stored[str(row["id"])]["minhash"] = encode_signature(signatures[row["id"]])
+    baseline = {
+        "version": BASELINE_VERSION,
+        "checks": {name: check_fingerprint(check) for name, check in CHECKS.items()},
+        "minhash": signature_fingerprint(),
+        "rows": stored,
+        "pairs": pairs,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(baseline, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def audit_changed(rows: list[dict], baseline: dict, jobs: int = 1) -> tuple[list[dict], dict]:
+    """
+    Re-audit only what changed since the baseline: rows whose text hash differs
+    get every check, the remaining rows only the checks whose fingerprint
+    changed. Returns the complete hits (reused + fresh) and run statistics.
+    """
+    changed_checks = [
+        name for name, check in CHECKS.items()
+        if baseline["checks"].get(name) != check_fingerprint(check)
+    ]
+    old_rows = baseline["rows"]
+    changed_rows, same_rows = [], []
+    for row in rows:
+        old = old_rows.get(str(row["id"]))
+        if old is None or old["hash"] != text_hash(row.get("text", "")):
+            changed_rows.append(row)
+        else:
+            same_rows.append(row)
+
+    fresh = audit_rows(changed_rows, jobs=jobs)
+    if changed_checks:
+        fresh += audit_rows(same_rows, jobs=jobs, names=changed_checks)
+
+    fresh_keys = {(hit["id"], hit["check"]) for hit in fresh}
+    audited_ids = {row["id"] for row in changed_rows}
+    reused = [
+        hit for row in same_rows for hit in old_rows[str(row["id"])]["hits"]
+        if hit["check"] in CHECKS and hit["check"] not in changed_checks
+        and (hit["id"], hit["check"]) not in fresh_keys
+    ]
+    order = {row["id"]: i for i, row in enumerate(rows)}
+    check_order = {name: i for i, name in enumerate(CHECKS)}
+    hits = sorted(fresh + reused, key=lambda hit: (order[hit["id"]], check_order[hit["check"]]))
+
+    stats = {
+        "audited_rows": len(changed_rows),
+        "changed_checks": changed_checks,
+        "skipped_rows": len(same_rows) if not changed_checks else 0,
+        "audited_ids": sorted(audited_ids),
+    }
+    return hits, stats
+
+
+def record_key(record: dict) -> tuple:
+    """Identity of a hit, (id, check), or of a pair, (ids, check), across runs."""
+    if record["kind"] == "pair":
+        return "pair", tuple(record["ids"]), record["check"]
+    return "row", record["id"], record["check"]
+
+
+def diff_records(old_records: list[dict], new_records: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Hits and pairs introduced and resolved between two runs."""
+    old_keys = {record_key(record) for record in old_records}
+    new_keys = {record_key(record) for record in new_records}
+    introduced = [record for record in new_records if record_key(record) not in old_keys]
+    resolved = [record for record in old_records if record_key(record) not in new_keys]
+    return introduced, resolved
+
+
+def summarize(rows: list[dict], hits: list[dict], pairs: list[dict] = ()) -> dict:
+    checks = {name: {"rows": 0, "spans": 0} for name in CHECKS}
+    for hit in hits:
+        checks[hit["check"]]["rows"] += 1
+        checks[hit["check"]]["spans"] += len(hit["spans"])
+    return {
+        "rows": len(rows),
+        "flagged_rows": len({hit["id"] for hit in hits}),
+        "total_hits": len(hits),
+        "checks": checks,
+        "pairs": {name: sum(1 for pair in pairs if pair["check"] == name) for name in PAIR_CHECKS},
+    }
+
+
+def write_jsonl(path: str, hits: list[dict]) -> None:
+    fh = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    try:
+        for hit in hits:
+            fh.write(json.dumps(hit, ensure_ascii=False) + "\n")
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+
+
+def print_report(rows: list[dict], hits: list[dict], limit: int = REPORT_LIMIT, pairs: list[dict] = ()) -> None:
+    by_id = {row["id"]: row for row in rows}
     print(f"Corpus: {len(rows)} meditations")
-    for name, check in CHECKS.items():
-        hits = [row for row in rows if check(row.get("text", ""))]
-        total_hits += len(hits)
-        print(f"\n{name}: {len(hits)} candidates")
-        for row in hits[:12]:
+    for name in CHECKS:
+        check_hits = [hit for hit in hits if hit["check"] == name]
+        print(f"\n{name}: {len(check_hits)} candidates")
+        for hit in check_hits[:limit]:
+            row = by_id[hit["id"]]
             text = " ".join(row["text"].split())
             print(f"- id={row['id']} book={row['book']} chapter={row['chapter']} len={len(row['text'])}: {text[:180]}")
-    print(f"\nTotal check hits: {total_hits}")
+    for name in PAIR_CHECKS:
+        check_pairs = [pair for pair in pairs if pair["check"] == name]
+        print(f"\n{name}: {len(check_pairs)} candidate pairs")
+        for pair in check_pairs[:limit]:
+            first, second = pair["rows"]
+            print(f"- id={first['id']} ({first['book']}.{first['chapter']}) ~ id={second['id']} "
+                  f"({second['book']}.{second['chapter']}): jaccard={pair['jaccard']:.2f} "
+                  f"(minhash~{pair['minhash']:.2f}) containment={pair['containment']:.2f}")
+    print(f"\nTotal check hits: {len(hits)}")
+
+
+def print_changes(summary: dict) -> None:
+    checks = ", ".join(summary["changed_checks"]) or "none"
+    print(f"\nIncremental audit: {summary['audited_rows']} of {summary['rows']} rows re-audited "
+          f"(changed checks: {checks})")
+    for label, records in (("introduced", summary["introduced"]), ("resolved", summary["resolved"])):
+        print(f"{label.capitalize()} hits and pairs: {len(records)}")
+        sign = "+" if label == "introduced" else "-"
+        for record in records:
+            if record["kind"] == "pair":
+                first, second = record["rows"]
+                print(f"  {sign} id={first['id']} ({first['book']}.{first['chapter']}) ~ id={second['id']} "
+                      f"({second['book']}.{second['chapter']}) {record['check']}")
+            else:
+                print(f"  {sign} id={record['id']} book={record['book']} chapter={record['chapter']} {record['check']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Audit the Meditations corpus for OCR/note artifacts.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON to audit")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--jsonl", metavar="PATH", help="write every hit and pair as JSONL ('-' for stdout)")
+    parser.add_argument("--summary", metavar="PATH", help="write per-check counts as JSON")
+    parser.add_argument("--limit", type=int, default=REPORT_LIMIT, help="rows printed per check in the text report")
+    parser.add_argument("--changed", action="store_true",
+                        help="only audit rows/checks changed since the baseline (and only shingle and "
+                             "hash changed rows for the pairs) and report new/resolved hits")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help=f"audit baseline file (default: {BASELINE_PATH.relative_to(ROOT)})")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    profiling.start_from(args, "audit_corpus")
+    with PROFILER.stage("load"):
+        rows = load_rows(args.data)
+    baseline = load_baseline(args.baseline) if args.changed else None
+    if args.changed and baseline is None:
+        print(f"No usable baseline at {args.baseline}; auditing every row", file=sys.stderr)
+
+    signatures = baseline_signatures(rows, baseline) if baseline is not None and np is not None else {}
+    with PROFILER.stage("pairs"):
+        pairs = near_duplicate_pairs(rows, signatures)
+    if np is None:
+        print("numpy not installed: near-duplicate pairs skipped", file=sys.stderr)
+    if baseline is None:
+        with PROFILER.stage("audit"):
+            hits = audit_rows(rows, jobs=args.jobs)
+        summary = summarize(rows, hits, pairs)
+    else:
+        with PROFILER.stage("audit"):
+            hits, stats = audit_changed(rows, baseline, jobs=args.jobs)
+        old_records = [hit for old in baseline["rows"].values() for hit in old["hits"]]
+        # Without numpy no pairs were computed: they are not resolved, just unknown
+        old_records += baseline["pairs"] if np is not None else []
+        introduced, resolved = diff_records(old_records, hits + pairs)
+        summary = {**summarize(rows, hits, pairs), **stats, "introduced": introduced, "resolved": resolved}
+    save_baseline(args.baseline, rows, hits, baseline["pairs"] if np is None and baseline else pairs, signatures)
+
+    if args.jsonl:
+        write_jsonl(args.jsonl, hits + pairs)
+    if args.summary:
+        Path(args.summary).write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+    if args.jsonl != "-":
+        print_report(rows, hits, limit=args.limit, pairs=pairs)
+        if baseline is not None:
+            print_changes(summary)
     return 0
 
 
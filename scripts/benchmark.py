@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Benchmarks for the corpus scripts over synthetic scaled corpora.
+
+The corpus in src/data/meditations.json is scaled to 1x, 10x, 100x and 1000x
+(1x-100x by default; the 1000x run takes tens of minutes):
+copy c of a passage is the same passage with its sentences rotated by c, so
+copies keep the length and vocabulary of the original but are distinct texts.
+For the extraction stages the scaled books are also laid out as synthetic
+page text the way PyMuPDF returns it (wrapped lines, hyphenated line breaks,
+running headers, folios and footnotes before some chapters).
+
+Each benchmark is timed separately (best of --repeat runs of at least 0.2 s,
+or a single run once a benchmark takes more than MIN_REPEAT_SECONDS) and
+traced once with tracemalloc for its peak memory:
+
+- clean_text and parse_chapters (extract_meditations.py) on the page text;
+- assign_themes (assign_themes.py) and clean_ocr_artifacts
+  (fix_meditations.py) on every passage;
+- every audit check in audit_corpus.CHECKS on every passage.
+
+Results are written as JSON (.cache/benchmarks/results.json by default).
+--save-baseline stores them as the baseline, and --compare flags benchmarks
+whose throughput dropped or whose peak memory grew by more than --threshold
+against it, exiting with status 1. Timings depend on the machine, so the
+baseline lives in .cache and is not committed.
+
+    python scripts/benchmark.py --scales 1,10 --save-baseline
+    python scripts/benchmark.py --scales 1,10 --compare
+    python scripts/benchmark.py --scales 1000 --only audit
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import re
+import sys
+import textwrap
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import assign_themes
+import audit_corpus
+import fix_meditations
+
+try:
+    import extract_meditations
+except ImportError:  # extract_meditations needs PyMuPDF; without it the extraction benchmarks are skipped
+    extract_meditations = None
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+RESULTS_DIR = ROOT / ".cache" / "benchmarks"
+RESULTS_PATH = RESULTS_DIR / "results.json"
+BASELINE_PATH = RESULTS_DIR / "baseline.json"
+
+RESULTS_VERSION = 1
+SCALES = (1, 10, 100, 1000)
+# 1000x takes tens of minutes; ask for it with --scales
+DEFAULT_SCALES = (1, 10, 100)
+REPEAT = 5
+MIN_REPEAT_SECONDS = 2.0
+THRESHOLD = 0.2
+# Memory growth below this is noise, whatever the ratio
+MIN_MEMORY_DELTA = 1 << 20
+
+LINE_WIDTH = 62
+LINES_PER_PAGE = 34
+HYPHENATE_EVERY = 7
+FOOTNOTE_EVERY = 5
+FOOTNOTE = "¹ Cf. SÉNECA, Cartas a Lucilio, XII, 3."
+ROMAN = ("I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def variant(text: str, copy: int) -> str:
+    """The text with its sentences rotated by `copy` (the text itself for copy 0)."""
+    sentences = SENTENCE_SPLIT.split(text)
+    shift = copy % len(sentences)
+    return " ".join(sentences[shift:] + sentences[:shift])
+
+
+def scaled_meditations(meditations: list[dict], scale: int) -> list[dict]:
+    """`scale` copies of the corpus; chapter numbers continue across copies of a book."""
+    chapters = {}
+    for meditation in meditations:
+        chapters[meditation["book"]] = max(chapters.get(meditation["book"], 0), meditation["chapter"])
+    return [
+        {
+            **meditation,
+            "id": copy * len(meditations) + meditation["id"],
+            "chapter": copy * chapters[meditation["book"]] + meditation["chapter"],
+            "text": variant(meditation["text"], copy),
+        }
+        for copy in range(scale)
+        for meditation in meditations
+    ]
+
+
+def hyphenate(lines: list[str]) -> list[str]:
+    """Break a long word across every HYPHENATE_EVERY-th line break, as in the printed pages."""
+    lines = list(lines)
+    for i in range(HYPHENATE_EVERY - 1, len(lines) - 1, HYPHENATE_EVERY):
+        word, _, rest = lines[i + 1].partition(" ")
+        if len(word) >= 6 and word.isalpha() and word.islower():
+            half = len(word) // 2
+            lines[i] += " " + word[:half] + "-"
+            lines[i + 1] = word[half:] + (" " + rest if rest else "")
+    return lines
+
+
+def synthetic_pages(meditations: list[dict], book: int) -> list[str]:
+    """Page texts of one book, laid out like PyMuPDF's get_text() output."""
+    lines = []
+    for n, meditation in enumerate(m for m in meditations if m["book"] == book):
+        if n and n % FOOTNOTE_EVERY == 0:
+            # Notes sit at the end of a chapter; the cleaner skips them up to the next chapter
+            lines.append(FOOTNOTE)
+        lines += hyphenate(textwrap.wrap(f"{meditation['chapter']}. {meditation['text']}", LINE_WIDTH))
+    pages = []
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        header = f"LIBRO {ROMAN[book - 1]}" if start == 0 else "MEDITACIONES"
+        folio = str(len(pages) + 44)
+        pages.append("\n".join([header, *lines[start:start + LINES_PER_PAGE], folio]))
+    return pages
+
+
+def synthetic_books(meditations: list[dict]) -> dict[int, str]:
+    """Book number -> joined page text, as extract_book_text returns it."""
+    books = sorted({m["book"] for m in meditations})
+    return {book: "\n".join(synthetic_pages(meditations, book)) for book in books}
+
+
+def benchmarks(meditations: list[dict], books: dict[int, str]) -> list[tuple]:
+    """(name, unit, units, input bytes, function) for every benchmark."""
+    texts = [m["text"] for m in meditations]
+    text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    entries = []
+    if books:
+        page_lines = sum(text.count("\n") + 1 for text in books.values())
+        page_bytes = sum(len(text.encode("utf-8")) for text in books.values())
+        entries += [
+            ("clean_text", "lines", page_lines, page_bytes,
+             lambda: [extract_meditations.clean_text(text) for text in books.values()]),
+            ("parse_chapters", "lines", page_lines, page_bytes,
+             lambda: [extract_meditations.parse_chapters(text, book) for book, text in books.items()]),
+        ]
+    entries += [
+        ("assign_themes", "passages", len(texts), text_bytes,
+         lambda: [assign_themes.assign_themes(text) for text in texts]),
+        ("clean_ocr_artifacts", "passages", len(texts), text_bytes,
+         lambda: [fix_meditations.clean_ocr_artifacts(text) for text in texts]),
+    ]
+    entries += [
+        (f"audit:{name}", "passages", len(texts), text_bytes,
+         lambda check=check: [check(text) for text in texts])
+        for name, check in audit_corpus.CHECKS.items()
+    ]
+    return entries
+
+
+def best_time(function, repeat: int) -> float:
+    """Best wall time per call over up to `repeat` timed runs.
+
+    Each run loops the function for at least 0.2 s (timeit's autorange), so
+    fast benchmarks aren't lost in timer noise; runs longer than
+    MIN_REPEAT_SECONDS are not repeated.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    times = [elapsed / number]
+    while len(times) < repeat and elapsed < MIN_REPEAT_SECONDS:
+        elapsed = timer.timeit(number)
+        times.append(elapsed / number)
+    return min(times)
+
+
+def peak_memory(function) -> int:
+    """Peak bytes allocated by one traced run (results included)."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(meditations: list[dict], scales, repeat: int = REPEAT, only=None) -> list[dict]:
+    def selected(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    results = []
+    for scale in scales:
+        corpus = scaled_meditations(meditations, scale)
+        # Laying out the pages is slow at large scales, so only when they are used
+        paged = extract_meditations is not None and (selected("clean_text") or selected("parse_chapters"))
+        books = synthetic_books(corpus) if paged else {}
+        for name, unit, units, size, function in benchmarks(corpus, books):
+            if not selected(name):
+                continue
+            seconds = best_time(function, repeat)
+            result = {
+                "benchmark": name,
+                "scale": scale,
+                "unit": unit,
+                "units": units,
+                "bytes": size,
+                "seconds": round(seconds, 6),
+                "throughput": round(units / seconds, 1),
+                "mb_per_s": round(size / seconds / 1e6, 2),
+                "peak_bytes": peak_memory(function),
+            }
+            results.append(result)
+            print(f"  {name:30s} {scale:5d}x {units:9,d} {unit:8s} {seconds:8.3f}s "
+                  f"{result['throughput']:12,.0f} {unit}/s {result['peak_bytes'] / 1e6:9.1f} MB", flush=True)
+    return results
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform()}
+
+
+def compare(results: list[dict], baseline: dict, threshold: float = THRESHOLD) -> list[dict]:
+    """Regressions against the baseline: throughput down or peak memory up by more than threshold."""
+    previous = {(r["benchmark"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n  {'benchmark':30s} {'scale':>6s} {'throughput':>11s} {'memory':>8s}")
+    for result in results:
+        old = previous.get((result["benchmark"], result["scale"]))
+        if old is None:
+            continue
+        speed = result["throughput"] / old["throughput"]
+        memory = result["peak_bytes"] / max(old["peak_bytes"], 1)
+        slower = speed < 1 - threshold
+        larger = memory > 1 + threshold and result["peak_bytes"] - old["peak_bytes"] > MIN_MEMORY_DELTA
+        flag = "  REGRESSION" if slower or larger else ""
+        print(f"  {result['benchmark']:30s} {result['scale']:5d}x {speed - 1:+10.1%} {memory - 1:+8.1%}{flag}")
+        if slower or larger:
+            regressions.append({**result, "speed_ratio": round(speed, 3), "memory_ratio": round(memory, 3)})
+    return regressions
+
+
+def write_results(path: Path, results: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {"version": RESULTS_VERSION, "environment": environment(), "results": results}
+    path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the corpus scripts on synthetic scaled corpora.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON to scale")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help=f"comma-separated corpus scales, from {', '.join(map(str, SCALES))} "
+                             f"(default: {','.join(map(str, DEFAULT_SCALES))})")
+    parser.add_argument("--only", action="append", metavar="PREFIX",
+                        help="run only benchmarks whose name starts with PREFIX (repeatable)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"timed runs per benchmark, best kept (default: {REPEAT})")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="results JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="stored baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="also store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="flag regressions against the baseline (exit 1 if any)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"relative change counted as a regression (default: {THRESHOLD})")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    scales = [int(scale) for scale in args.scales.split(",")]
+    meditations = json.loads(args.data.read_text(encoding="utf-8"))["meditations"]
+    if extract_meditations is None:
+        print("PyMuPDF not installed: clean_text and parse_chapters skipped", file=sys.stderr)
+
+    print(f"Benchmarks over {len(meditations)} passages at scales {', '.join(f'{s}x' for s in scales)}")
+    results = run_benchmarks(meditations, scales, args.repeat, args.only)
+    write_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+
+    status = 0
+    if args.compare:
+        if not args.baseline.exists():
+            raise SystemExit(f"ERROR: no baseline at {args.baseline} (run with --save-baseline first)")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("environment") != environment():
+            print("Warning: the baseline was recorded on a different environment", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
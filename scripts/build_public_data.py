@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Build the compact corpus artifacts served from public/data.
+
+src/data/meditations.json is the canonical, pretty-printed corpus that the app
+bundles. This stage derives everything under public/data from it:
+
+- meditations.json: the full corpus, minified (the service worker fetches it).
+- books/book-NN.json: one minified JSON array of meditations per book, so a
+  client can lazy-load only the book it is reading.
+- manifest.json: corpus metadata plus, per book, its shard and the id,
+  chapter, themes and byte offset/length of every record inside the shard
+  (each slice is valid JSON on its own, e.g. for a Range request).
+- search-index.json: the accent-folded, stemmed inverted index built by
+  search_index.py.
+- facets.json: per-theme and per-book bitsets with precomputed counts, built
+  by facets.py.
+- insights.json: the precomputed "Profundizar" panel of every meditation
+  (insights.py), the same file the app bundles from src/data.
+- related.json: the top-k related passages of every meditation, for reading
+  next (related.py; only when numpy and scipy are installed).
+- daily/YYYY-MM.json: the service worker's daily-meditation schedule for
+  --schedule-years years from --schedule-start (daily_schedule.py). The
+  window is recorded in the manifest ("schedule") and later builds reuse it,
+  so the output doesn't depend on the date of the build; only passing
+  --schedule-start or --schedule-years moves it, and months outside the new
+  window are then removed. Outside the window the service worker falls back
+  to the full corpus.
+- versions/ and patches/: the row manifests of the last few corpus versions
+  and a delta patch from each of them to the current one, listed in the
+  manifest under "patches", so the service worker updates a cached corpus
+  without downloading it again (corpus_versions.py).
+- .gz and .br precompressed variants of every JSON file (.br only when the
+  brotli module is installed).
+
+Files whose content is unchanged are not rewritten.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import gzip
+import json
+import time
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz variants are produced
+    brotli = None
+
+import related
+from corpus_versions import build_versions, corpus_version, load_history
+from daily_schedule import DEFAULT_YEARS, build_daily_schedule
+from facets import build_facets
+from insights import build_insights
+from search_index import build_search_index
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+PUBLIC_DATA_DIR = ROOT / "public" / "data"
+
+MANIFEST_FIELDS = ["id", "chapter", "themes", "offset", "length"]
+# The per-month schedule files are a few KB each: not worth precompressing;
+# the row manifests of versions/ are only read by the build
+UNCOMPRESSED_PREFIXES = ("daily/", "versions/")
+# Directories whose files are all generated: stale ones are removed
+GENERATED_DIRS = ("daily", "versions", "patches")
+
+
+def minify(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def shard_bytes(meditations: list[dict]) -> tuple[bytes, list[list]]:
+    """Serialize one book as a JSON array; returns its bytes and manifest rows."""
+    parts = [b"["]
+    offset = 1
+    rows = []
+    for i, meditation in enumerate(meditations):
+        if i:
+            parts.append(b",")
+            offset += 1
+        record = minify(meditation).encode("utf-8")
+        rows.append([meditation["id"], meditation["chapter"], meditation["themes"], offset, len(record)])
+        parts.append(record)
+        offset += len(record)
+    parts.append(b"]")
+    return b"".join(parts), rows
+
+
+def build_artifacts(data: dict, schedule_start: int, schedule_years: int = DEFAULT_YEARS,
+                    history: list[dict] = ()) -> dict[str, bytes]:
+    """Relative path -> content for every public/data file (before compression).
+
+    history holds the row manifests of previous versions (newest first), to
+    write patches from them to this one.
+    """
+    meditations = data["meditations"]
+    full = minify(data).encode("utf-8")
+    artifacts = {"meditations.json": full}
+
+    by_book: dict[int, list[dict]] = {}
+    for meditation in meditations:
+        by_book.setdefault(meditation["book"], []).append(meditation)
+
+    books = []
+    for book, rows in sorted(by_book.items()):
+        path = f"books/book-{book:02d}.json"
+        content, manifest_rows = shard_bytes(rows)
+        artifacts[path] = content
+        books.append({"book": book, "file": path, "bytes": len(content), "count": len(rows),
+                      "meditations": manifest_rows})
+
+    search_index = minify(build_search_index(meditations)).encode("utf-8")
+    artifacts["search-index.json"] = search_index
+    facets = minify(build_facets(data)).encode("utf-8")
+    artifacts["facets.json"] = facets
+    insights = minify(build_insights(meditations)[0]).encode("utf-8")
+    artifacts["insights.json"] = insights
+    if related.np is not None:
+        artifacts["related.json"] = minify(related.build_related(data)).encode("utf-8")
+
+    version_files, patches = build_versions(data, history)
+    artifacts.update(version_files)
+
+    manifest = {
+        "version": corpus_version(full),
+        "corpus": {key: value for key, value in data.items() if key != "meditations"},
+        "full": {"file": "meditations.json", "bytes": len(full), "count": len(meditations)},
+        "search": {"file": "search-index.json", "bytes": len(search_index)},
+        "facets": {"file": "facets.json", "bytes": len(facets)},
+        "insights": {"file": "insights.json", "bytes": len(insights)},
+        "fields": MANIFEST_FIELDS,
+        "books": books,
+        "patches": patches,
+        "schedule": {"start": schedule_start, "years": schedule_years},
+    }
+    if "related.json" in artifacts:
+        manifest["related"] = {"file": "related.json", "bytes": len(artifacts["related.json"])}
+    artifacts["manifest.json"] = minify(manifest).encode("utf-8")
+
+    for path, month in build_daily_schedule(meditations, schedule_start, schedule_years).items():
+        artifacts[path] = minify(month).encode("utf-8")
+    return artifacts
+
+
+def compressed_variants(artifacts: dict[str, bytes]) -> dict[str, bytes]:
+    variants = {}
+    for path, content in artifacts.items():
+        if path.startswith(UNCOMPRESSED_PREFIXES):
+            continue
+        variants[path + ".gz"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants[path + ".br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write_artifacts(out_dir: Path, files: dict[str, bytes]) -> list[str]:
+    """Write files that changed; returns their relative paths."""
+    written = []
+    for path, content in files.items():
+        target = out_dir / path
+        if target.exists() and target.read_bytes() == content:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        written.append(path)
+    return written
+
+
+def prune_generated(out_dir: Path, files: dict[str, bytes]) -> list[str]:
+    """Remove files of GENERATED_DIRS no longer built (months outside the
+    schedule window, versions and patches that fell out of the history)."""
+    removed = []
+    for directory in GENERATED_DIRS:
+        for target in sorted((out_dir / directory).glob("*.json*")):
+            path = target.relative_to(out_dir).as_posix()
+            if path not in files:
+                target.unlink()
+                removed.append(path)
+    return removed
+
+
+def parse_seconds(content: bytes, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(content)
+    return (time.perf_counter() - started) / repeat
+
+
+def report(source: bytes, files: dict[str, bytes]) -> None:
+    full = files["meditations.json"]
+    print(f"{'file':28s} {'bytes':>9s} {'gzip':>8s} {'brotli':>8s}")
+    print(f"{'src (pretty, indent=2)':28s} {len(source):9,d} {len(gzip.compress(source, 9, mtime=0)):8,d} "
+          f"{len(brotli.compress(source, quality=11)) if brotli else 0:8,d}")
+    for path in ("meditations.json", "manifest.json", "search-index.json", "facets.json", "insights.json",
+                 "related.json"):
+        if path not in files:
+            continue
+        print(f"{path:28s} {len(files[path]):9,d} {len(files[path + '.gz']):8,d} "
+              f"{len(files.get(path + '.br', b'')):8,d}")
+    shards = [path for path in files if path.startswith("books/") and path.endswith(".json")]
+    sizes = [len(files[path]) for path in shards]
+    gz_sizes = [len(files[path + ".gz"]) for path in shards]
+    br_sizes = [len(files.get(path + ".br", b"")) for path in shards]
+    print(f"{'books/*.json (mean of %d)' % len(shards):28s} {sum(sizes) // len(sizes):9,d} "
+          f"{sum(gz_sizes) // len(gz_sizes):8,d} {sum(br_sizes) // len(br_sizes):8,d}")
+
+    pretty_parse = parse_seconds(source)
+    full_parse = parse_seconds(full)
+    shard_parse = sum(parse_seconds(files[path]) for path in shards) / len(shards)
+    print(f"\nMinified: {1 - len(full) / len(source):.1%} smaller than the pretty source")
+    print(f"json parse: pretty {pretty_parse * 1000:.2f} ms, minified {full_parse * 1000:.2f} ms, "
+          f"one book {shard_parse * 1000:.2f} ms")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build minified, precompressed and per-book corpus files for public/data.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="canonical corpus JSON")
+    parser.add_argument("--out", type=Path, default=PUBLIC_DATA_DIR, help="output directory")
+    parser.add_argument("--schedule-start", type=int,
+                        help="first year of the daily schedule (default: the one in the current manifest, "
+                             "or the current year on a first build)")
+    parser.add_argument("--schedule-years", type=int,
+                        help=f"years covered by the daily schedule (default: the current manifest's, "
+                             f"or {DEFAULT_YEARS})")
+    parser.add_argument("--report", action="store_true", help="print size and parse-time comparisons")
+    return parser.parse_args()
+
+
+def previous_schedule(out_dir: Path) -> dict:
+    """The schedule window of the manifest already in out_dir ({} if there is none)."""
+    try:
+        return json.loads((out_dir / "manifest.json").read_text(encoding="utf-8")).get("schedule", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def main() -> int:
+    args = parse_args()
+    source = args.data.read_bytes()
+    previous = previous_schedule(args.out)
+    schedule_start = args.schedule_start or previous.get("start") or datetime.date.today().year
+    schedule_years = args.schedule_years or previous.get("years") or DEFAULT_YEARS
+    artifacts = build_artifacts(json.loads(source), schedule_start, schedule_years, load_history(args.out))
+    files = {**artifacts, **compressed_variants(artifacts)}
+    written = write_artifacts(args.out, files)
+    removed = prune_generated(args.out, files)
+
+    print(f"{len(files)} files in {args.out}: {len(written)} written, {len(files) - len(written)} unchanged, "
+          f"{len(removed)} removed")
+    if brotli is None:
+        print("brotli module not installed: .br variants skipped")
+    if related.np is None:
+        print("numpy/scipy not installed: related.json skipped")
+    if args.report:
+        print()
+        report(source, files)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Content-addressed corpus versions and delta patches for the service worker.
+
+A corpus version is the first 12 hex digits of the SHA-256 of the minified
+corpus (the "version" of public/data/manifest.json). build_public_data.py
+keeps the recent versions in public/data and writes, next to the full corpus:
+
+- versions/<version>.json: the row manifest of a version, {"version",
+  "header", "rows": [[id, hash], ...]} in corpus order, where a row hash is
+  the SHA-256 of the minified meditation (16 hex digits) and "header" the
+  hash of the other top-level fields (themes, book contexts, ...).
+- versions/index.json: {"versions": [...]}, the current version and up to
+  MAX_VERSIONS - 1 older ones that have a patch, newest first. The next
+  build reads it back, so the history lives in public/data with the rest of
+  the generated files.
+- patches/<from>-<to>.json: for every older version in the index, the delta
+  to the current one, {"from", "to", "removed": [ids], "changed": [rows],
+  "added": [rows]}, plus "header" (the new top-level fields) when they
+  changed and "order" (the ids in corpus order) when the rows are not in id
+  order. Patches over MAX_PATCH_RATIO of the full corpus are not written,
+  and their base version leaves the history: its clients download the full
+  corpus, and later patches from it would be just as large.
+
+manifest.json lists the patches by base version, so a client holding
+version N fetches patches/<N>-<current>.json (a few KB for a typical fix)
+instead of the whole corpus; public/sw.js applies it with applyCorpusPatch,
+the counterpart of apply_patch here.
+
+Run directly to check that every stored patch, applied to its base corpus,
+gives back the current corpus byte for byte, in Python and through
+applyCorpusPatch in public/sw.js (executed with node). Base corpora come from
+the git history of src/data/meditations.json and from --base files; a patch
+without its base, or older versions without a verified patch, fail the
+check. A synthetic patch (changed, added and removed rows and a new header,
+from a base derived from the current corpus) is always checked as well, so
+both implementations are exercised even when no patch is stored:
+
+    python scripts/corpus_versions.py --verify
+    python scripts/corpus_versions.py --seed-git 5    # add committed versions to the history
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+PUBLIC_DATA_DIR = ROOT / "public" / "data"
+SW_PATH = ROOT / "public" / "sw.js"
+
+MAX_VERSIONS = 5
+# A patch bigger than this share of the full corpus isn't worth it: clients
+# on that version download the corpus instead
+MAX_PATCH_RATIO = 0.5
+VERSION_DIGITS = 12
+ROW_HASH_DIGITS = 16
+INDEX_PATH = "versions/index.json"
+GIT_DEPTH = 20
+
+
+def minify(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def sha256_hex(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def corpus_version(full: bytes) -> str:
+    """Version of a corpus from its minified bytes."""
+    return sha256_hex(full)[:VERSION_DIGITS]
+
+
+def row_hash(meditation: dict) -> str:
+    return sha256_hex(minify(meditation).encode("utf-8"))[:ROW_HASH_DIGITS]
+
+
+def header_of(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key != "meditations"}
+
+
+def row_manifest(data: dict) -> dict:
+    return {
+        "version": corpus_version(minify(data).encode("utf-8")),
+        "header": row_hash(header_of(data)),
+        "rows": [[meditation["id"], row_hash(meditation)] for meditation in data["meditations"]],
+    }
+
+
+def build_patch(base: dict, data: dict, manifest: dict) -> dict:
+    """Delta from the version described by the row manifest `base` to `data`."""
+    old_rows = dict(map(tuple, base["rows"]))
+    new_ids = {meditation["id"] for meditation in data["meditations"]}
+    patch = {
+        "from": base["version"],
+        "to": manifest["version"],
+        "removed": [row_id for row_id, _ in base["rows"] if row_id not in new_ids],
+        "changed": [],
+        "added": [],
+    }
+    for meditation, (row_id, digest) in zip(data["meditations"], manifest["rows"]):
+        if row_id not in old_rows:
+            patch["added"].append(meditation)
+        elif old_rows[row_id] != digest:
+            patch["changed"].append(meditation)
+    if base["header"] != manifest["header"]:
+        patch["header"] = header_of(data)
+    ids = [row_id for row_id, _ in manifest["rows"]]
+    if ids != sorted(ids):
+        patch["order"] = ids
+    return patch
+
+
+def apply_patch(corpus: dict, patch: dict) -> dict:
+    """Apply a patch to the full corpus of its base version (see applyCorpusPatch in sw.js)."""
+    removed = set(patch["removed"])
+    rows = {meditation["id"]: meditation for meditation in corpus["meditations"] if meditation["id"] not in removed}
+    for meditation in patch["changed"] + patch["added"]:
+        rows[meditation["id"]] = meditation
+    order = patch.get("order") or sorted(rows)
+    return {**patch.get("header", header_of(corpus)), "meditations": [rows[row_id] for row_id in order]}
+
+
+def patch_path(base_version: str, version: str) -> str:
+    return f"patches/{base_version}-{version}.json"
+
+
+def load_history(out_dir: Path) -> list[dict]:
+    """Row manifests of the versions in versions/index.json, newest first (missing ones skipped)."""
+    try:
+        index = json.loads((out_dir / INDEX_PATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    history = []
+    for version in index.get("versions", []):
+        try:
+            history.append(json.loads((out_dir / f"versions/{version}.json").read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return history
+
+
+def build_versions(data: dict, history: list[dict]) -> tuple[dict[str, bytes], dict[str, str]]:
+    """Files for versions/ and patches/, and the manifest's {base version: patch file}.
+
+    The current version goes first in the history (if it isn't there
+    already), followed by the older versions whose patch is small enough,
+    up to MAX_VERSIONS in all.
+    """
+    manifest = row_manifest(data)
+    full_size = len(minify(data).encode("utf-8"))
+    versions = [manifest]
+    files = {}
+    patches = {}
+    for base in history:
+        if base["version"] == manifest["version"] or len(versions) == MAX_VERSIONS:
+            continue
+        content = minify(build_patch(base, data, manifest)).encode("utf-8")
+        if len(content) <= MAX_PATCH_RATIO * full_size:
+            versions.append(base)
+            path = patch_path(base["version"], manifest["version"])
+            files[path] = content
+            patches[base["version"]] = path
+    files[INDEX_PATH] = minify({"versions": [base["version"] for base in versions]}).encode("utf-8")
+    files.update({f"versions/{base['version']}.json": minify(base).encode("utf-8") for base in versions})
+    return files, patches
+
+
+def git_corpora(path: Path = DATA_PATH, depth: int = GIT_DEPTH) -> list[tuple[str, dict]]:
+    """(commit, corpus) for the last `depth` commits that touched the corpus, newest first."""
+    relative = path.resolve().relative_to(ROOT).as_posix()
+    try:
+        log = subprocess.run(["git", "-C", str(ROOT), "log", f"-{depth}", "--format=%h", "--", relative],
+                             capture_output=True, text=True, check=True).stdout.split()
+        return [
+            (commit, json.loads(subprocess.run(["git", "-C", str(ROOT), "show", f"{commit}:{relative}"],
+                                               capture_output=True, text=True, check=True).stdout))
+            for commit in log
+        ]
+    except (OSError, subprocess.CalledProcessError):
+        return []
+
+
+def sw_function(name: str) -> str:
+    """Source of a top-level function in public/sw.js."""
+    match = re.search(rf"^(?:async )?function {name}\(.*?^\}}", SW_PATH.read_text(encoding="utf-8"), re.M | re.S)
+    if not match:
+        raise SystemExit(f"ERROR: {name} not found in {SW_PATH}")
+    return match.group()
+
+
+def run_sw_patches(cases: list[tuple[dict, dict]]) -> list[bytes]:
+    """applyCorpusPatch from sw.js over (corpus, patch) cases, re-serialised with JSON.stringify."""
+    node = shutil.which("node")
+    if node is None:
+        raise SystemExit("ERROR: --verify needs node to run applyCorpusPatch from public/sw.js")
+    script = "\n".join([
+        sw_function("applyCorpusPatch"),
+        "const cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));",
+        "process.stdout.write(JSON.stringify(cases.map(([corpus, patch]) =>",
+        "  JSON.stringify(applyCorpusPatch(corpus, patch)))));",
+    ])
+    payload = json.dumps([list(case) for case in cases], ensure_ascii=False)
+    result = subprocess.run([node, "-e", script], input=payload.encode("utf-8"), capture_output=True, check=True)
+    return [output.encode("utf-8") for output in json.loads(result.stdout)]
+
+
+def synthetic_base(data: dict) -> dict:
+    """An older corpus derived from data: two rows edited, the last row missing,
+    an extra row and another title, so its patch has every kind of change."""
+    rows = [dict(meditation) for meditation in data["meditations"][:-1]]
+    for meditation in rows[:2]:
+        meditation["text"] = meditation["text"][:-1]
+    extra = max(meditation["id"] for meditation in data["meditations"]) + 1
+    rows.append({**rows[-1], "id": extra, "text": "Fila retirada."})
+    return {**header_of(data), "title": f"{data.get('title', '')} (anterior)", "meditations": rows}
+
+
+def verify(out_dir: Path, bases: list[tuple[str, dict]]) -> bool:
+    """Apply every stored patch to its base corpus and compare with the full corpus in out_dir.
+
+    Fails when a listed patch has no base corpus to apply it to, or when the
+    history has older versions but no patch could be checked.
+    """
+    full = (out_dir / "meditations.json").read_bytes()
+    current = json.loads(full)
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    ok = True
+    if manifest["version"] != corpus_version(full):
+        print(f"manifest version {manifest['version']} does not match meditations.json ({corpus_version(full)})")
+        ok = False
+    rows = json.loads((out_dir / f"versions/{manifest['version']}.json").read_text(encoding="utf-8"))
+    if rows != row_manifest(current):
+        print(f"versions/{manifest['version']}.json does not describe meditations.json")
+        ok = False
+
+    by_version = {}
+    for label, corpus in bases:
+        by_version.setdefault(corpus_version(minify(corpus).encode("utf-8")), (label, corpus))
+    cases = []
+    for base_version, path in sorted(manifest.get("patches", {}).items()):
+        if base_version not in by_version:
+            print(f"  {path}: no base corpus for {base_version} (pass it with --base)")
+            ok = False
+            continue
+        label, corpus = by_version[base_version]
+        patch = json.loads((out_dir / path).read_text(encoding="utf-8"))
+        cases.append((path, label, corpus, patch))
+
+    stored = len(cases)
+    base = synthetic_base(current)
+    cases.append(("synthetic patch", "a derived base", base, build_patch(row_manifest(base), current, rows)))
+
+    sw_outputs = run_sw_patches([(corpus, patch) for _, _, corpus, patch in cases])
+    for (path, label, corpus, patch), sw_output in zip(cases, sw_outputs):
+        patched = minify(apply_patch(corpus, patch)).encode("utf-8")
+        identical = patched == full and sw_output == full
+        ok &= identical
+        size = len(minify(patch).encode("utf-8"))
+        print(f"  {path} on {label}: {len(patch['changed'])} changed, {len(patch['added'])} added, "
+              f"{len(patch['removed'])} removed, {size:,d} of {len(full):,d} bytes -> "
+              f"{'identical' if identical else 'DIFFERS'} (python {'ok' if patched == full else 'differs'}, "
+              f"sw.js {'ok' if sw_output == full else 'differs'})")
+    print(f"{stored} of {len(manifest.get('patches', {}))} stored patches verified")
+    # Every older version in the history must have been served a verified patch
+    older = len(load_history(out_dir)) - 1
+    if older > stored:
+        print(f"versions/index.json lists {older} older version(s) but only {stored} patch(es) were verified")
+        ok = False
+    return ok
+
+
+def seed_from_git(out_dir: Path, depth: int) -> list[str]:
+    """Add the corpora of recent commits to versions/ (oldest last); returns the versions added."""
+    history = load_history(out_dir)
+    known = {base["version"] for base in history}
+    added = []
+    for _, corpus in git_corpora(depth=depth):
+        base = row_manifest(corpus)
+        if base["version"] not in known:
+            history.append(base)
+            known.add(base["version"])
+            added.append(base["version"])
+    history = history[:MAX_VERSIONS]
+    for base in history:
+        target = out_dir / f"versions/{base['version']}.json"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(minify(base), encoding="utf-8")
+    (out_dir / INDEX_PATH).write_text(minify({"versions": [base["version"] for base in history]}), encoding="utf-8")
+    return [version for version in added if version in {base["version"] for base in history}]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verify or seed the corpus versions and delta patches in public/data.")
+    parser.add_argument("--out", type=Path, default=PUBLIC_DATA_DIR, help="public data directory")
+    parser.add_argument("--verify", action="store_true",
+                        help="check that every patch rebuilds meditations.json exactly (python and sw.js via node)")
+    parser.add_argument("--base", type=Path, action="append", default=[], metavar="PATH",
+                        help="extra base corpus for --verify (besides the git history)")
+    parser.add_argument("--seed-git", type=int, metavar="N",
+                        help="add the corpora of the last N commits to the version history "
+                             "(run build_public_data.py afterwards to write their patches)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.seed_git:
+        added = seed_from_git(args.out, args.seed_git)
+        print(f"{len(added)} version(s) added to {args.out / INDEX_PATH}: {', '.join(added) or 'none'}")
+    if args.verify:
+        bases = [(f"git {commit}", corpus) for commit, corpus in git_corpora()]
+        bases += [(str(path), json.loads(path.read_text(encoding="utf-8"))) for path in args.base]
+        return 0 if verify(args.out, bases) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
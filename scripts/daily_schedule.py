@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Precomputed daily-meditation schedule for the service worker.
+
+public/sw.js picks the notification's meditation with a string hash of the
+local date (getDailyMeditation) over the full corpus. This module reproduces
+that selection, including JavaScript's 32-bit integer arithmetic and UTF-16
+string lengths for the truncated body, and emits one small file per month:
+
+    daily/YYYY-MM.json  {"count": N, "days": [[id, body], ...]}  (day 1 first)
+
+so the notification path fetches a few KB instead of the whole corpus.
+build_public_data.py writes these files into public/data.
+
+Run directly to check the schedule against the functions in public/sw.js
+(executed with node):
+
+    python scripts/daily_schedule.py --check
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import datetime
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+SW_PATH = ROOT / "public" / "sw.js"
+
+BODY_LIMIT = 150
+DEFAULT_YEARS = 2
+
+
+def to_int32(value: int) -> int:
+    value &= 0xFFFFFFFF
+    return value - 0x100000000 if value >= 0x80000000 else value
+
+
+def js_date_string(day: datetime.date) -> str:
+    """`${getFullYear()}-${getMonth()}-${getDate()}`, with the 0-based month."""
+    return f"{day.year}-{day.month - 1}-{day.day}"
+
+
+def js_date_hash(date_string: str) -> int:
+    """The hash loop of getDailyMeditation: hash = ((hash << 5) - hash) + c, then hash & hash."""
+    value = 0
+    for char in date_string:
+        value = to_int32(to_int32(value << 5) - value + ord(char))
+    return value
+
+
+def daily_index(day: datetime.date, count: int) -> int:
+    return abs(js_date_hash(js_date_string(day))) % count
+
+
+def notification_body(text: str) -> str:
+    """Truncate like sw.js, where length and substring count UTF-16 code units.
+
+    If the cut splits a surrogate pair, the lone half that JavaScript would
+    keep is dropped, since it can't be stored as UTF-8.
+    """
+    units = text.encode("utf-16-le")
+    if len(units) // 2 <= BODY_LIMIT:
+        return text
+    return units[:(BODY_LIMIT - 3) * 2].decode("utf-16-le", errors="ignore") + "..."
+
+
+def build_daily_schedule(meditations: list[dict], start_year: int, years: int = DEFAULT_YEARS) -> dict[str, dict]:
+    """Relative path -> month schedule for every month of the given years."""
+    schedule = {}
+    for year in range(start_year, start_year + years):
+        for month in range(1, 13):
+            days = []
+            for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                meditation = meditations[daily_index(datetime.date(year, month, day), len(meditations))]
+                days.append([meditation["id"], notification_body(meditation["text"])])
+            schedule[f"daily/{year}-{month:02d}.json"] = {"count": len(meditations), "days": days}
+    return schedule
+
+
+def sw_function(name: str) -> str:
+    """Source of a top-level function in public/sw.js."""
+    match = re.search(rf"^function {name}\(.*?^\}}", SW_PATH.read_text(encoding="utf-8"), re.M | re.S)
+    if not match:
+        raise SystemExit(f"ERROR: {name} not found in {SW_PATH}")
+    return match.group()
+
+
+def check_schedule(meditations: list[dict], schedule: dict[str, dict]) -> bool:
+    """Run getDailyMeditation and notificationBody from sw.js in node for every scheduled date."""
+    node = shutil.which("node")
+    if node is None:
+        raise SystemExit("ERROR: --check needs node to run the functions from public/sw.js")
+    dates = []
+    expected = []
+    for path, month in sorted(schedule.items()):
+        year, month_num = map(int, Path(path).stem.split("-"))
+        for day, entry in enumerate(month["days"], start=1):
+            dates.append([year, month_num - 1, day])
+            expected.append(entry)
+
+    script = "\n".join([
+        "const RealDate = Date;",
+        "let fixed = null;",
+        "globalThis.Date = class extends RealDate {",
+        "  constructor(...args) { if (args.length) { super(...args); } else { super(...fixed); } }",
+        "};",
+        sw_function("getDailyMeditation"),
+        sw_function("notificationBody"),
+        "const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));",
+        "const out = input.dates.map(date => {",
+        "  fixed = date;",
+        "  const meditation = getDailyMeditation(input.meditations);",
+        "  return [meditation.id, notificationBody(meditation.text)];",
+        "});",
+        "process.stdout.write(JSON.stringify(out));",
+    ])
+    payload = json.dumps({"dates": dates, "meditations": [{"id": m["id"], "text": m["text"]} for m in meditations]})
+    result = subprocess.run([node, "-e", script], input=payload, capture_output=True, text=True, check=True)
+    actual = json.loads(result.stdout)
+
+    mismatches = [(date, want, got) for date, want, got in zip(dates, expected, actual) if want != got]
+    print(f"{len(dates)} dates checked against public/sw.js: {len(dates) - len(mismatches)} identical")
+    for (year, month0, day), want, got in mismatches[:10]:
+        print(f"  {year}-{month0 + 1:02d}-{day:02d}: schedule id={want[0]}, sw.js id={got[0]}")
+    return not mismatches
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or check the precomputed daily-meditation schedule.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON")
+    parser.add_argument("--start-year", type=int, default=datetime.date.today().year)
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--check", action="store_true", help="compare with getDailyMeditation in public/sw.js via node")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    meditations = json.loads(args.data.read_text(encoding="utf-8"))["meditations"]
+    schedule = build_daily_schedule(meditations, args.start_year, args.years)
+    sizes = [len(json.dumps(month, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+             for month in schedule.values()]
+    print(f"{len(schedule)} month files, {min(sizes):,d}-{max(sizes):,d} bytes each")
+    today = datetime.date.today()
+    month = schedule.get(f"daily/{today.year}-{today.month:02d}.json")
+    if month:
+        meditation_id, body = month["days"][today.day - 1]
+        print(f"Today ({today.isoformat()}): id={meditation_id}: {body}")
+    if args.check:
+        return 0 if check_schedule(meditations, schedule) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,8 +6,37 @@ Versión mejorada con parsing por páginas específicas de cada libro.
 import fitz  # PyMuPDF
 import re
 import json
+import argparse
+import hashlib
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import profiling
+from profiling import PROFILER
+
+
+# Metadatos comunes del JSON de salida
+CORPUS_HEADER = {
+    "author": "Marco Aurelio",
+    "title": "Meditaciones",
+    "description": "Reflexiones del emperador filósofo romano Marco Aurelio (121-180 d.C.)",
+    "themes": [
+        {"id": "virtue", "name": "Virtud", "icon": "⚖️"},
+        {"id": "death", "name": "Muerte y Mortalidad", "icon": "💀"},
+        {"id": "nature", "name": "Naturaleza", "icon": "🌿"},
+        {"id": "duty", "name": "Deber y Responsabilidad", "icon": "🏛️"},
+        {"id": "mind", "name": "Control Mental", "icon": "🧠"},
+        {"id": "time", "name": "Tiempo y Transitoriedad", "icon": "⏳"},
+        {"id": "adversity", "name": "Adversidad", "icon": "🔥"},
+        {"id": "relationships", "name": "Relaciones Humanas", "icon": "🤝"},
+        {"id": "simplicity", "name": "Simplicidad", "icon": "🪨"},
+        {"id": "wisdom", "name": "Sabiduría", "icon": "📜"}
+    ]
+}
+
 
 # Mapeo de libros a páginas (índice de fitz, 0-based)
 # Cada libro empieza en start_page y termina antes de end_page
@@ -37,8 +66,292 @@ def extract_book_text(pdf, start_page: int, end_page: int) -> str:
     return text
 
 
-def clean_text(text: str) -> str:
+# Modo layout: en lugar de adivinar con expresiones regulares qué líneas son
+# notas, headers o folios, se usa la geometría de get_text("dict"). El cuerpo
+# del texto es el tamaño de letra dominante del libro (no de la página: hay
+# páginas con más nota que texto); las líneas claramente más pequeñas son
+# notas al pie, salvo en la banda superior, donde son el header corrido o el
+# número de página.
+LAYOUT_SMALL_FONT_RATIO = 0.85
+LAYOUT_HEADER_BAND = 0.10
+
+LAYOUT_BODY = 'body'
+LAYOUT_FOOTNOTE = 'footnote'
+LAYOUT_RUNNING_HEADER = 'running_header'
+LAYOUT_FOLIO = 'folio'
+
+
+def page_lines(page) -> list:
+    """Devuelve [(y, tamaño de letra, texto)] para cada línea de la página."""
+    lines = []
+    # Sin las flags de sólo texto, "dict" decodifica también las imágenes
+    # escaneadas de cada página y es decenas de veces más lento.
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block["lines"]:
+            spans = line["spans"]
+            text = "".join(span["text"] for span in spans)
+            size = max((span["size"] for span in spans if span["text"].strip()), default=0)
+            lines.append((line["bbox"][1], size, text))
+    return lines
+
+
+def body_font_size(pages_lines) -> float:
+    """Tamaño de letra con más caracteres en un conjunto de páginas."""
+    chars_by_size = Counter()
+    for lines in pages_lines:
+        for _, size, text in lines:
+            chars_by_size[round(size, 1)] += len(text.strip())
+    return chars_by_size.most_common(1)[0][0] if chars_by_size else 0
+
+
+def classify_page_lines(lines: list, body_size: float, page_height: float) -> list:
+    """Devuelve [(categoría, texto)] para las líneas de una página."""
+    header_limit = page_height * LAYOUT_HEADER_BAND
+    classified = []
+    for y, size, text in lines:
+        if size >= body_size * LAYOUT_SMALL_FONT_RATIO:
+            category = LAYOUT_BODY
+        elif y < header_limit:
+            category = LAYOUT_FOLIO if text.replace(' ', '').isdigit() else LAYOUT_RUNNING_HEADER
+        else:
+            category = LAYOUT_FOOTNOTE
+        classified.append((category, text))
+    return classified
+
+
+def iter_layout_pages(pdf, start_page: int, end_page: int):
+    """Genera [(categoría, texto)] por página de un libro.
+
+    Hace una primera pasada sólo para medir el tamaño de letra del cuerpo,
+    así que nunca retiene más de una página a la vez.
+    """
+    page_range = range(start_page, min(end_page, len(pdf)))
+    body_size = body_font_size(page_lines(pdf[i]) for i in page_range)
+    for i in page_range:
+        page = pdf[i]
+        yield i, classify_page_lines(page_lines(page), body_size, page.rect.height)
+
+
+def layout_text(classified: list) -> str:
+    """Texto de una página con sólo las líneas del cuerpo."""
+    return "".join(text + "\n" for category, text in classified if category == LAYOUT_BODY)
+
+
+def read_book_pages(pdf_path: str, start_page: int, end_page: int, cached_pages=None, layout: bool = False) -> dict:
+    """Devuelve {índice de página: texto} para un rango, reutilizando la caché.
+
+    Sólo abre el PDF si falta alguna página. Las páginas fuera del documento
+    se guardan como None para no volver a abrirlo por ellas.
+    """
+    cached_pages = cached_pages or {}
+    pages = {i: cached_pages[i] for i in range(start_page, end_page) if i in cached_pages}
+    missing = [i for i in range(start_page, end_page) if i not in pages]
+    if missing:
+        pdf = fitz.open(pdf_path)
+        try:
+            if layout:
+                # El tamaño del cuerpo se mide sobre todo el libro
+                pages = {i: None for i in range(start_page, end_page)}
+                pages.update((i, layout_text(lines)) for i, lines in iter_layout_pages(pdf, start_page, end_page))
+            else:
+                for i in missing:
+                    pages[i] = pdf[i].get_text() if i < len(pdf) else None
+        finally:
+            pdf.close()
+    return pages
+
+
+def join_pages(pages: dict, start_page: int, end_page: int) -> str:
+    """Une las páginas igual que extract_book_text."""
+    return "".join(pages[i] + "\n" for i in range(start_page, end_page) if pages.get(i) is not None)
+
+
+# Caché en disco del texto de cada página. La clave es el hash del contenido
+# del PDF, la versión de PyMuPDF y el modo (texto plano o layout): si cambia
+# cualquiera de ellos, la entrada anterior deja de usarse y se borra al
+# guardar la nueva.
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "page_text"
+
+
+def pdf_content_hash(pdf_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_mode(layout: bool) -> str:
+    return 'layout' if layout else 'text'
+
+
+def page_cache_path(pdf_hash: str, layout: bool = False) -> Path:
+    return CACHE_DIR / f"{pdf_hash[:20]}-fitz{fitz.VersionBind}-{cache_mode(layout)}.json"
+
+
+def load_page_cache(pdf_path: str, layout: bool = False) -> tuple:
+    """Carga la caché de páginas del PDF. Devuelve (hash, {índice: texto})."""
+    pdf_hash = pdf_content_hash(pdf_path)
+    cache_path = page_cache_path(pdf_hash, layout)
+    if not cache_path.exists():
+        return pdf_hash, {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return pdf_hash, {}
+    if (data.get('pdf_hash') != pdf_hash or data.get('fitz_version') != fitz.VersionBind
+            or data.get('mode') != cache_mode(layout)):
+        return pdf_hash, {}
+    return pdf_hash, {int(i): text for i, text in data['pages'].items()}
+
+
+def save_page_cache(pdf_path: str, pdf_hash: str, pages: dict, layout: bool = False):
+    """Guarda la caché y elimina entradas antiguas del mismo PDF y modo."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path = page_cache_path(pdf_hash, layout)
+    source = str(Path(pdf_path).resolve())
+    for stale in CACHE_DIR.glob('*.json'):
+        if stale == cache_path:
+            continue
+        try:
+            with open(stale, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('pdf_path') == source and entry.get('mode', 'text') == cache_mode(layout):
+                stale.unlink()
+        except (OSError, ValueError):
+            stale.unlink(missing_ok=True)
+
+    data = {
+        'pdf_path': source,
+        'pdf_hash': pdf_hash,
+        'fitz_version': fitz.VersionBind,
+        'mode': cache_mode(layout),
+        'pages': {str(i): pages[i] for i in sorted(pages)},
+    }
+    tmp_path = cache_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    tmp_path.replace(cache_path)
+
+
+# Categorías de línea que reconoce clean_text
+PAGE_NUMBER = 'page_number'
+RUNNING_HEADER = 'running_header'
+BOOK_HEADER = 'book_header'
+FOOTNOTE_START = 'footnote_start'
+CHAPTER_START = 'chapter_start'
+NOTE_CONTINUATION = 'note_continuation'
+BODY = 'body'
+
+# Patrones por categoría, en orden de prioridad. Se combinan en una única
+# alternancia compilada: la primera rama que coincide decide la categoría.
+LINE_CATEGORY_PATTERNS = [
+    # Números de página solos
+    (PAGE_NUMBER, r'\d+\s*$'),
+    # Headers como "MliDITACIONES", "MEDITACIONES"
+    (RUNNING_HEADER, r'(?i:M[LlIiEe]?[DdIi]?[IiEe]?T[Aa][Cc][Ii][OoÓó][Nn][EeLlIi][IiLlEeSs]?S?\s*$)'),
+    # Headers de libro como "LIBRO X" o "L I B R O X"
+    (BOOK_HEADER, r'L\s*I?\s*B?\s*R?\s*O?\s+[IVX]+\s*$'),
+    # Inicio de notas al pie (referencias bibliográficas, ^1 Nombre...)
+    (FOOTNOTE_START, r'(?i:' + '|'.join([
+        r'\s*[\^¹²³⁴⁵⁶⁷⁸⁹]\s*[A-Z]',
+        r'Cf\.',
+        r'Según\s+[A-Z]',
+        r'Texto\s+(?:difícil|corrupto|con\s+lagunas)',
+        r'Existe\s+en\s+el\s+texto',
+        r'La\s+traducción',
+        r'Seguimos\s+a',
+        r'Aceptamos',
+        r'FARQUHARSON',
+        r'TRANNOY',
+        r'A\.\s*I\.\s*TRANNOY',
+        r'En\s+la\s+edición',
+        r'Sobre\s+la\s+respuesta',
+        r'\([^)]*conjetura[^)]*\)',
+        r'Esta\s+línea\s+se\s+refiere',
+        r'Los\s+cuados',
+        r'El\s+río\s+Gran',
+    ]) + r')'),
+    # Nuevo capítulo: "12. Texto..."
+    (CHAPTER_START, r'\d+\.\s+[A-Z¿¡«]'),
+    # Continuación de notas: nombre propio seguido de una explicación típica
+    (NOTE_CONTINUATION, r'[A-Z][a-záéíóú]+(?:io|o|a|as|os|e|es)?,?\s+(?:fue|era|es|son)\s+(?:un|una|el|la|uno)'),
+]
+
+LINE_CLASSIFIER = re.compile('|'.join(
+    f'(?P<{category}>{pattern})' for category, pattern in LINE_CATEGORY_PATTERNS
+))
+
+SKIPPED_CATEGORIES = {PAGE_NUMBER, RUNNING_HEADER, BOOK_HEADER}
+NOTE_CATEGORIES = {FOOTNOTE_START, NOTE_CONTINUATION}
+
+
+def classify_line(stripped: str) -> str:
+    """Devuelve la categoría de una línea ya recortada en una sola pasada."""
+    match = LINE_CLASSIFIER.match(stripped)
+    return match.lastgroup if match else BODY
+
+
+def iter_clean_lines(lines, stats=None, note_rules: bool = True):
+    """Versión perezosa de clean_text: filtra un iterable de líneas.
+
+    Si se pasa un Counter en stats, cuenta las líneas descartadas por
+    categoría (y como 'inside_note' las saltadas dentro de una nota). Con
+    note_rules=False (modo layout, las notas ya se quitaron por geometría)
+    las reglas de inicio y continuación de nota no se aplican.
+    """
+    skip_until_chapter = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Saltar líneas vacías
+        if not stripped:
+            continue
+
+        category = classify_line(stripped)
+        if not note_rules and category in NOTE_CATEGORIES:
+            category = BODY
+
+        if category in SKIPPED_CATEGORIES:
+            if stats is not None:
+                stats[category] += 1
+            continue
+
+        # Una nota al pie se salta junto con todo lo que sigue hasta el próximo capítulo
+        if category == FOOTNOTE_START:
+            skip_until_chapter = True
+            if stats is not None:
+                stats[category] += 1
+            continue
+
+        if skip_until_chapter:
+            if category != CHAPTER_START:
+                if stats is not None:
+                    stats['inside_note'] += 1
+                continue
+            skip_until_chapter = False
+
+        if category == NOTE_CONTINUATION:
+            skip_until_chapter = True
+            if stats is not None:
+                stats[category] += 1
+            continue
+
+        yield stripped
+
+
+def clean_text(text: str, note_rules: bool = True) -> str:
     """Limpia el texto de notas al pie, headers y otros artefactos."""
+    return '\n'.join(iter_clean_lines(text.split('\n'), note_rules=note_rules))
+
+
+def _clean_text_reference(text: str) -> str:
+    """Implementación original de clean_text (una llamada re.match por patrón).
+
+    Se conserva sólo como referencia para --check-clean-text.
+    """
     lines = text.split('\n')
     clean_lines = []
     skip_until_chapter = False
@@ -115,12 +428,220 @@ def clean_text(text: str) -> str:
     return '\n'.join(clean_lines)
 
 
-def parse_chapters(text: str, book_num: int) -> list:
+# Reglas de limpieza que se aplican a cada capítulo ya separado, en orden.
+# Cada regla es (nombre, tipo, patrón, reemplazo, guarda). La guarda es una
+# tupla de subcadenas de las que al menos una tiene que aparecer para que la
+# regla pueda coincidir; si no aparece ninguna, la pasada se salta sin
+# ejecutar la regex. Tipos:
+#   'sub'     re.sub normal.
+#   'strip'   borrado independiente; las reglas 'strip' consecutivas se
+#             combinan en una sola alternancia.
+#   'literal' reemplazo de texto fijo; las consecutivas se combinan en una
+#             sola búsqueda con diccionario.
+#   'despace' une letras sueltas separadas por espacios (errores de OCR).
+#   'cut'     corta el texto donde empieza un residuo de nota, si antes hay
+#             contenido significativo (más de CUT_MIN_OFFSET caracteres).
+CHAPTER_RULES = [
+    # Limpiar el contenido
+    # (equivale a \s+ -> ' ', pero no reescribe los espacios simples)
+    ('collapse_whitespace', 'sub', r'\s{2,}|[^\S ]', ' ', None),
+    # Eliminar cualquier referencia de nota que quede
+    ('note_marks', 'sub', r'[\^¹²³⁴⁵⁶⁷⁸⁹]+\d*', '', None),
+    # Limpiar caracteres especiales del OCR
+    ('ocr_cuerpo', 'literal', 'cueφo', 'cuerpo', None),
+    ('ocr_sorprendido', 'literal', 'soφrendido', 'sorprendido', None),
+    ('ocr_sorprender', 'literal', 'soφrender', 'sorprender', None),
+    ('ocr_sorpresa', 'literal', 'soφresa', 'sorpresa', None),
+    ('ocr_estefania', 'literal', 'Esteφanía', 'Estefanía', None),
+    ('ocr_termino', 'literal', 'ténnino', 'término', None),
+    ('ocr_permanezca', 'literal', 'pennanezca', 'permanezca', None),
+    # Eliminar headers de página que puedan haber quedado (varios formatos de OCR)
+    ('page_header_numbered', 'strip', r'\d+\s*M[LlIiEe:\)\(]+[IiDd]*TAC[Ii][\(\)OoÓó]+N[EeLlIi:\)\(]+S?\s*', '', None),
+    ('page_header', 'strip', r'(?i:M[LlIiEe:\)\(]+[IiDd]*TAC[Ii][\(\)OoÓó]+N[EeLlIi:\)\(]+S?\s*)', '', None),
+    # Eliminar números de página con espacios (como "1 1 4" o "1 1")
+    ('spaced_folio_end', 'sub', r'\s+\d\s+\d\s*\d?\s*$', '', None),
+    ('spaced_folio', 'sub', r'\s+\d\s+\d\s+\d\s+', ' ', None),
+    # Eliminar referencias como "Referencia a Epicuro"
+    ('reference_note_end', 'sub', r'\s*Referencia a [A-Z][a-záéíóú]+\.?\s*$', '', ('Referencia a ',)),
+    # Eliminar texto fragmentado al final (como "elestrat egoquecontrató a")
+    ('loose_word_end', 'sub', r'\s+[a-z]+\s*$', '', None),
+    ('spaced_strategos_end', 'sub', r'\s+Es algo así como si el\s*e\s*s\s*t\s*r\s*a\s*t\s*e\s*g\s*o.*$', '', ('Es algo así como si',)),
+    ('strategos_end', 'sub', r'\s+Es algo así como si.*$', '', ('Es algo así como si',)),
+    # Eliminar espacios extraños en medio de palabras (OCR errors)
+    ('despace', 'despace', None, None, None),
+    # Eliminar residuos de notas al final
+    ('cut_note_fue', 'cut', r'\s+[A-Z][a-záéíóú]+,?\s+(?:fue|era)\s+(?:un|una|el|la)', None, (' fue ', ' era ')),
+    ('cut_cf', 'cut', r'\s+Cf\.\s+', None, ('Cf.',)),
+    ('cut_segun', 'cut', r'\s+Según\s+[A-Z]', None, ('Según',)),
+    ('cut_texto', 'cut', r'\s+Texto\s+(?:difícil|corrupto)', None, ('Texto',)),
+    ('cut_farquharson', 'cut', r'\s+FARQUHARSON', None, ('FARQUHARSON',)),
+    ('cut_trannoy', 'cut', r'\s+TRANNOY', None, ('TRANNOY',)),
+    # Limpiar espacios múltiples
+    ('final_whitespace', 'sub', r'\s{2,}|[^\S ]', ' ', None),
+]
+CUT_MIN_OFFSET = 50
+DESPACE_RUN = 7
+
+_WHITESPACE_SPLIT = re.compile(r'(\s+)')
+# Condición necesaria para una unión: cinco tokens seguidos de una sola letra.
+# Casi ningún capítulo la cumple, así que el recorrido por tokens sólo se hace
+# cuando aparece.
+_SINGLE_LETTER_RUN = re.compile(r'(?<!\S)\w(?:\s+\w(?!\S)){%d}' % (DESPACE_RUN - 3))
+
+
+def _is_word_char(char: str) -> bool:
+    """Equivalente a \\w de re para un carácter."""
+    return char.isalnum() or char == '_'
+
+
+def despace_tokens(content: str) -> tuple:
+    """Une siete caracteres de palabra separados sólo por espacios.
+
+    Reproduce re.sub(r'(\\w)\\s+(\\w)…(\\w)' × 7, ''.join) con un recorrido
+    lineal por tokens en lugar de una regex con backtracking: la unión empieza
+    en el último carácter de un token, sigue con cinco tokens de una sola
+    letra y termina en el primer carácter del séptimo. Devuelve (texto, uniones).
+    """
+    if not _SINGLE_LETTER_RUN.search(content):
+        return content, 0
+
+    parts = _WHITESPACE_SPLIT.split(content)
+    words, separators = parts[0::2], parts[1::2]
+    n = len(words)
+
+    # single_run[j]: cuántos tokens seguidos de una sola letra empiezan en j
+    single_run = [0] * (n + 1)
+    for j in range(n - 1, -1, -1):
+        word = words[j]
+        single_run[j] = single_run[j + 1] + 1 if len(word) == 1 and _is_word_char(word) else 0
+
+    inner = DESPACE_RUN - 2
+    out = []
+    hits = 0
+    can_start = True
+    i = 0
+    while i < n:
+        word = words[i]
+        last = i + DESPACE_RUN - 1
+        if (can_start and word and _is_word_char(word[-1]) and last < n
+                and single_run[i + 1] >= inner and words[last] and _is_word_char(words[last][0])):
+            # La regex retoma la búsqueda justo después del primer carácter
+            # del último token: sólo puede volver a empezar en él si es más largo
+            can_start = len(words[last]) > 1
+            words[last] = word + ''.join(words[i + 1:last]) + words[last]
+            hits += 1
+            i = last
+            continue
+        out.append(word)
+        if i < len(separators):
+            out.append(separators[i])
+        can_start = True
+        i += 1
+    return ''.join(out), hits
+
+
+def compile_chapter_rules(rules: list) -> list:
+    """Agrupa las reglas en el mínimo de pasadas.
+
+    Devuelve una lista de (kind, names, payload, guard) donde payload depende
+    del tipo de pasada: (regex, reemplazo), regex combinada de borrados o
+    (regex combinada, tabla de reemplazos) para los literales.
+    """
+    passes = []
+    for name, kind, pattern, replacement, guard in rules:
+        previous = passes[-1] if passes else None
+        if kind in ('literal', 'strip') and previous and previous[0] == kind:
+            previous[1].append(name)
+            previous[2].append((name, pattern, replacement))
+            # Una pasada combinada sólo puede saltarse si todas sus reglas tienen guarda
+            previous[3] = previous[3] and guard and previous[3] + guard
+            continue
+        if kind in ('literal', 'strip'):
+            passes.append([kind, [name], [(name, pattern, replacement)], guard])
+        else:
+            passes.append([kind, [name], (pattern and re.compile(pattern), replacement), guard])
+
+    compiled = []
+    for kind, names, payload, guard in passes:
+        if kind == 'literal':
+            table = {literal: (name, replacement) for name, literal, replacement in payload}
+            # Los literales más largos primero, para que ninguno tape a otro
+            alternation = '|'.join(re.escape(literal) for literal in sorted(table, key=len, reverse=True))
+            payload = (re.compile(alternation), table)
+        elif kind == 'strip':
+            payload = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern, _ in payload))
+        compiled.append((kind, names, payload, guard))
+    return compiled
+
+
+CHAPTER_PASSES = compile_chapter_rules(CHAPTER_RULES)
+
+
+def clean_chapter_content(content: str, hits=None, timings=None, calls=None) -> str:
+    """Limpia el texto de un capítulo ya separado aplicando CHAPTER_RULES.
+
+    Si se pasan Counters, hits acumula las coincidencias de cada regla, y
+    timings y calls el tiempo y las ejecuciones de cada pasada (por el nombre
+    de su primera regla). Sin ellos, con --profile se usan los del perfil.
+    """
+    if hits is None and PROFILER.enabled:
+        hits, timings, calls = PROFILER.rules('chapter')
+    for kind, names, payload, guard in CHAPTER_PASSES:
+        if guard and not any(literal in content for literal in guard):
+            continue
+        if timings is not None:
+            started = time.perf_counter()
+
+        if kind == 'literal':
+            pattern, table = payload
+            if hits is None:
+                content = pattern.sub(lambda m: table[m.group()][1], content)
+            else:
+                def replace_literal(m):
+                    name, replacement = table[m.group()]
+                    hits[name] += 1
+                    return replacement
+                content = pattern.sub(replace_literal, content)
+        elif kind == 'strip':
+            if hits is None:
+                content = payload.sub('', content)
+            else:
+                def strip_match(m):
+                    hits[m.lastgroup] += 1
+                    return ''
+                content = payload.sub(strip_match, content)
+        elif kind == 'despace':
+            content, count = despace_tokens(content)
+            if hits is not None:
+                hits[names[0]] += count
+        elif kind == 'cut':
+            pattern, _ = payload
+            match = pattern.search(content)
+            if match and match.start() > CUT_MIN_OFFSET:
+                content = content[:match.start()].strip()
+                if hits is not None:
+                    hits[names[0]] += 1
+        else:
+            pattern, replacement = payload
+            content, count = pattern.subn(replacement, content)
+            if hits is not None:
+                hits[names[0]] += count
+
+        if timings is not None:
+            timings[names[0]] += time.perf_counter() - started
+        if calls is not None:
+            calls[names[0]] += 1
+
+    return content.strip()
+
+
+def parse_chapters(text: str, book_num: int, note_rules: bool = True) -> list:
     """Parsea el texto y extrae los capítulos."""
     chapters = []
 
     # Primero limpiamos el texto
-    text = clean_text(text)
+    with PROFILER.stage('clean_text'):
+        text = clean_text(text, note_rules)
 
     # Unir líneas partidas por guiones
     text = re.sub(r'-\n', '', text)
@@ -142,60 +663,8 @@ def parse_chapters(text: str, book_num: int) -> list:
             chapter_num = int(parts[i])
             content = parts[i + 1].strip()
 
-            # Limpiar el contenido
-            content = re.sub(r'\s+', ' ', content)
-
-            # Eliminar cualquier referencia de nota que quede
-            content = re.sub(r'[\^¹²³⁴⁵⁶⁷⁸⁹]+\d*', '', content)
-
-            # Limpiar caracteres especiales del OCR
-            content = content.replace('cueφo', 'cuerpo')
-            content = content.replace('soφrendido', 'sorprendido')
-            content = content.replace('soφrender', 'sorprender')
-            content = content.replace('soφresa', 'sorpresa')
-            content = content.replace('Esteφanía', 'Estefanía')
-            content = content.replace('ténnino', 'término')
-            content = content.replace('pennanezca', 'permanezca')
-
-            # Eliminar headers de página que puedan haber quedado (varios formatos de OCR)
-            content = re.sub(r'\d+\s*M[LlIiEe:\)\(]+[IiDd]*TAC[Ii][\(\)OoÓó]+N[EeLlIi:\)\(]+S?\s*', '', content)
-            content = re.sub(r'M[LlIiEe:\)\(]+[IiDd]*TAC[Ii][\(\)OoÓó]+N[EeLlIi:\)\(]+S?\s*', '', content, flags=re.IGNORECASE)
-
-            # Eliminar números de página con espacios (como "1 1 4" o "1 1")
-            content = re.sub(r'\s+\d\s+\d\s*\d?\s*$', '', content)
-            content = re.sub(r'\s+\d\s+\d\s+\d\s+', ' ', content)
-
-            # Eliminar referencias como "Referencia a Epicuro"
-            content = re.sub(r'\s*Referencia a [A-Z][a-záéíóú]+\.?\s*$', '', content)
-
-            # Eliminar texto fragmentado al final (como "elestrat egoquecontrató a")
-            content = re.sub(r'\s+[a-z]+\s*$', '', content)  # Eliminar palabra suelta al final
-            content = re.sub(r'\s+Es algo así como si el\s*e\s*s\s*t\s*r\s*a\s*t\s*e\s*g\s*o.*$', '', content)
-            content = re.sub(r'\s+Es algo así como si.*$', '', content)
-
-            # Eliminar espacios extraños en medio de palabras (OCR errors)
-            content = re.sub(r'(\w)\s+(\w)\s+(\w)\s+(\w)\s+(\w)\s+(\w)\s+(\w)',
-                           lambda m: ''.join(m.groups()) if len(''.join(m.groups())) < 15 else m.group(0),
-                           content)
-
-            # Eliminar residuos de notas al final
-            # Cortar si encontramos patrones típicos de inicio de nota
-            cut_patterns = [
-                r'\s+[A-Z][a-záéíóú]+,?\s+(?:fue|era)\s+(?:un|una|el|la)',
-                r'\s+Cf\.\s+',
-                r'\s+Según\s+[A-Z]',
-                r'\s+Texto\s+(?:difícil|corrupto)',
-                r'\s+FARQUHARSON',
-                r'\s+TRANNOY',
-            ]
-
-            for cut_pattern in cut_patterns:
-                match = re.search(cut_pattern, content)
-                if match and match.start() > 50:  # Solo si hay contenido significativo antes
-                    content = content[:match.start()].strip()
-
-            # Limpiar espacios múltiples
-            content = re.sub(r'\s+', ' ', content).strip()
+            with PROFILER.stage('clean_chapter_content'):
+                content = clean_chapter_content(content)
 
             if len(content) > 10:
                 chapters.append({
@@ -211,25 +680,568 @@ def parse_chapters(text: str, book_num: int) -> list:
     return chapters
 
 
+# Modo streaming: páginas -> líneas limpias -> líneas lógicas -> capítulos.
+# Reproduce parse_chapters sin construir nunca el texto completo del libro.
+_JOIN_PREV_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzáéíóú,;')
+_JOIN_NEXT_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzáéíóú')
+_CHAPTER_MARKER = re.compile(r'(\d+)\.\s+')
+_BARE_CHAPTER_MARKER = re.compile(r'(\d+)\.')
+
+
+def iter_page_texts(pdf, start_page: int, end_page: int, layout: bool = False):
+    """Genera el texto de cada página del rango, decodificándolas de una en una."""
+    if layout:
+        for _, lines in iter_layout_pages(pdf, start_page, end_page):
+            yield layout_text(lines) + "\n"
+        return
+    for i in range(start_page, end_page):
+        if i < len(pdf):
+            yield pdf[i].get_text() + "\n"
+
+
+def iter_joined_lines(lines):
+    """Une líneas partidas por guiones y líneas que continúan una oración."""
+    current = None
+    for line in lines:
+        if current is None:
+            current = line
+        elif current.endswith('-'):
+            current = current[:-1] + line
+        elif current[-1:] in _JOIN_PREV_CHARS and line[:1] in _JOIN_NEXT_CHARS:
+            current = current + ' ' + line
+        else:
+            yield current
+            current = line
+    if current is not None:
+        yield current
+
+
+def iter_chapter_parts(lines):
+    """Genera (número, texto bruto) en cuanto aparece el siguiente marcador.
+
+    Equivale al re.split de parse_chapters: un marcador "N." sin texto en su
+    línea consume el salto de línea, así que la línea siguiente nunca abre
+    capítulo.
+    """
+    chapter_num = None
+    buffer = []
+    pending_bare = None
+
+    for line in lines:
+        if pending_bare is not None:
+            if chapter_num is not None:
+                yield chapter_num, '\n'.join(buffer)
+            chapter_num, buffer, pending_bare = pending_bare, [line], None
+            continue
+
+        match = _CHAPTER_MARKER.match(line)
+        if match:
+            if chapter_num is not None:
+                yield chapter_num, '\n'.join(buffer)
+            chapter_num, buffer = match.group(1), [line[match.end():]]
+            continue
+
+        bare = _BARE_CHAPTER_MARKER.fullmatch(line)
+        if bare:
+            pending_bare = bare.group(1)
+            continue
+
+        buffer.append(line)
+
+    # Un marcador al final del texto no va seguido de espacio: es contenido
+    if pending_bare is not None:
+        buffer.append(pending_bare + '.')
+    if chapter_num is not None:
+        yield chapter_num, '\n'.join(buffer)
+
+
+def iter_book_chapters(page_texts, stats=None, note_rules: bool = True, rule_hits=None, rule_timings=None):
+    """Genera los capítulos de un libro a partir de un iterable de páginas.
+
+    Con stats, además de lo que cuenta iter_clean_lines, registra en
+    'chapter_cleanup' los capítulos que la limpieza posterior modificó.
+    rule_hits y rule_timings se pasan tal cual a clean_chapter_content.
+    """
+    lines = (line for page_text in page_texts for line in page_text.split('\n'))
+    for chapter_num, raw in iter_chapter_parts(iter_joined_lines(iter_clean_lines(lines, stats, note_rules))):
+        content = clean_chapter_content(raw.strip(), rule_hits, rule_timings)
+        if stats is not None and content != ' '.join(raw.split()):
+            stats['chapter_cleanup'] += 1
+        if len(content) > 10:
+            yield {
+                'chapter': int(chapter_num),
+                'text': content
+            }
+
+
+def write_corpus_stream(output_path, header: dict, meditations) -> int:
+    """Escribe el JSON del corpus registro a registro.
+
+    El resultado es idéntico byte a byte a json.dump(..., indent=2) sobre el
+    diccionario completo, pero sólo mantiene en memoria una meditación.
+    """
+    head = json.dumps(header, ensure_ascii=False, indent=2)
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(head[:-2] + ',\n  "meditations": [')
+        for meditation in meditations:
+            record = json.dumps(meditation, ensure_ascii=False, indent=2)
+            f.write((',\n' if count else '\n') + '    ' + record.replace('\n', '\n    '))
+            count += 1
+        f.write('\n  ]\n}' if count else ']\n}')
+    return count
+
+
+def process_book(pdf_path: str, book_num: int, page_range: tuple, cached_pages=None, layout: bool = False) -> tuple:
+    """Extrae y parsea un libro completo abriendo el PDF por su cuenta.
+
+    Cada proceso del pool necesita su propio documento fitz: los objetos
+    de PyMuPDF no se pueden compartir entre procesos. Devuelve
+    (chapters, pages) para que el proceso principal actualice la caché.
+    """
+    start_page, end_page = page_range
+    with PROFILER.stage(f'book {book_num}'):
+        with PROFILER.stage('read_pages'):
+            pages = read_book_pages(pdf_path, start_page, end_page, cached_pages, layout)
+        book_text = join_pages(pages, start_page, end_page)
+        with PROFILER.stage('parse_chapters'):
+            chapters = parse_chapters(book_text, book_num, note_rules=not layout)
+    return chapters, pages
+
+
+def extract_all_books(pdf_path: str, jobs: int = 1, page_cache=None, book_pages=None,
+                      layout: bool = False) -> dict:
+    """Procesa todos los libros, en serie o repartidos en un pool de procesos.
+
+    Devuelve {book_num: chapters} en orden de libro, de modo que los ids
+    asignados después son idénticos a los de una ejecución en serie. Si se
+    pasa page_cache, se usa y se completa con las páginas leídas del PDF.
+    book_pages sustituye a la tabla BOOK_PAGES (p. ej. rangos detectados) y
+    layout activa la clasificación de líneas por geometría.
+    """
+    book_pages = BOOK_PAGES if book_pages is None else book_pages
+    book_nums = sorted(book_pages)
+    ranges = [book_pages[book_num] for book_num in book_nums]
+    cached = [
+        None if page_cache is None else {
+            i: page_cache[i] for i in range(*page_range) if i in page_cache
+        }
+        for page_range in ranges
+    ]
+    if jobs <= 1:
+        results = [process_book(pdf_path, *args, layout) for args in zip(book_nums, ranges, cached)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(book_nums))) as pool:
+            results = list(pool.map(
+                process_book, [pdf_path] * len(book_nums), book_nums, ranges, cached, [layout] * len(book_nums)
+            ))
+
+    chapters_by_book = {}
+    for book_num, (chapters, pages) in zip(book_nums, results):
+        chapters_by_book[book_num] = chapters
+        if page_cache is not None:
+            page_cache.update(pages)
+    return chapters_by_book
+
+
+def build_corpus(chapters_by_book: dict) -> dict:
+    """Numera los capítulos de todos los libros y arma el JSON final."""
+    all_meditations = []
+    for book_num, chapters in chapters_by_book.items():
+        for ch in chapters:
+            all_meditations.append({
+                'id': len(all_meditations) + 1,
+                'book': book_num,
+                'chapter': ch['chapter'],
+                'text': ch['text'],
+                'themes': []
+            })
+    return {**CORPUS_HEADER, "meditations": all_meditations}
+
+
+def extract_corpus(pdf_path: str, jobs: int = 1, use_cache: bool = True, book_pages=None,
+                   layout: bool = False) -> dict:
+    """Extrae el corpus completo en memoria, usando y actualizando la caché de páginas."""
+    page_cache = None
+    if use_cache:
+        pdf_hash, page_cache = load_page_cache(pdf_path, layout)
+        cached_count = len(page_cache)
+    chapters_by_book = extract_all_books(pdf_path, jobs, page_cache, book_pages, layout)
+    if page_cache is not None and len(page_cache) != cached_count:
+        save_page_cache(pdf_path, pdf_hash, page_cache, layout)
+    return build_corpus(chapters_by_book)
+
+
+# Detección automática de los rangos de cada libro. Una página abre libro si
+# en sus primeras líneas aparece "LIBRO <romano>" y además contiene el
+# capítulo 1. Los headers corridos repiten "LIBRO ..." (a menudo con el
+# numeral equivocado), pero nunca junto a un "1." de inicio de capítulo.
+_BOOK_OPENING_HEADER = re.compile(r'L\s*I\s*B\s*R\s*O\s+([IVXΧ]+)\b')
+_FIRST_CHAPTER = re.compile(r'^1\.\s+[A-Z¿¡«]', re.MULTILINE)
+_INDEX_HEADING = re.compile(r'^[IÍY]\s*N\s*[DO]\s*I\s*C\s*[EL]', re.MULTILINE)
+_ROMAN_VALUES = {'I': 1, 'V': 5, 'X': 10}
+HEADER_SCAN_LINES = 3
+
+
+def roman_to_int(numeral: str) -> int:
+    """Convierte un numeral romano (I..XXXIX) a entero; admite la Χ griega del OCR."""
+    values = [_ROMAN_VALUES[c] for c in numeral.replace('Χ', 'X')]
+    return sum(-v if i + 1 < len(values) and v < values[i + 1] else v for i, v in enumerate(values))
+
+
+def detect_book_pages(pdf_path: str, page_cache=None) -> dict:
+    """Recorre el PDF una vez y deduce {book_num: (start_page, end_page)}.
+
+    Usa el texto de la caché de páginas cuando existe. El último libro
+    termina en la primera página de índices o al final del documento.
+    """
+    page_cache = page_cache or {}
+    openings = []
+    end_of_text = None
+    pdf = fitz.open(pdf_path)
+    try:
+        page_count = len(pdf)
+        for i in range(page_count):
+            text = page_cache.get(i)
+            if text is None:
+                text = pdf[i].get_text()
+            head = '\n'.join(text.lstrip().split('\n', HEADER_SCAN_LINES)[:HEADER_SCAN_LINES])
+            header = _BOOK_OPENING_HEADER.search(head)
+            if header and _FIRST_CHAPTER.search(text):
+                openings.append((i, roman_to_int(header.group(1))))
+                end_of_text = None
+            elif openings and end_of_text is None and _INDEX_HEADING.match(text.lstrip()):
+                end_of_text = i
+    finally:
+        pdf.close()
+
+    book_pages = {}
+    for n, (start_page, numeral) in enumerate(openings, start=1):
+        if numeral != n:
+            print(f"  Aviso: la página {start_page+1} dice LIBRO {numeral} pero es el libro {n} en orden")
+        end_page = openings[n][0] if n < len(openings) else (end_of_text or page_count)
+        book_pages[n] = (start_page, end_page)
+    return book_pages
+
+
+def report_book_pages(detected: dict, expected: dict) -> int:
+    """Imprime los rangos detectados y cualquier discrepancia con la tabla."""
+    mismatches = 0
+    for book_num in sorted(set(detected) | set(expected)):
+        found = detected.get(book_num)
+        table = expected.get(book_num)
+        status = "ok" if found == table else "DIFIERE"
+        mismatches += found != table
+        print(f"  Libro {book_num:2d}: detectado {found}  tabla {table}  {status}")
+    return mismatches
+
+
+def layout_report(pdf_path: str, book_pages: dict) -> dict:
+    """Compara el modo texto con el modo layout sobre todos los libros.
+
+    Para cada modo cuenta las decisiones que tienen que tomar las reglas
+    regex (líneas descartadas por categoría y capítulos retocados después
+    del split) e imprime cuántas deja de necesitar el modo layout. Devuelve
+    {modo: {book_num: chapters}}.
+    """
+    results = {}
+    stats = {}
+    rule_hits = {}
+    geometry = Counter()
+    pdf = fitz.open(pdf_path)
+    try:
+        for layout in (False, True):
+            mode = cache_mode(layout)
+            stats[mode] = Counter()
+            rule_hits[mode] = Counter()
+            results[mode] = {}
+            started = time.perf_counter()
+            for book_num, (start_page, end_page) in sorted(book_pages.items()):
+                pages = list(iter_page_texts(pdf, start_page, end_page, layout))
+                results[mode][book_num] = list(iter_book_chapters(
+                    pages, stats[mode], note_rules=not layout, rule_hits=rule_hits[mode]
+                ))
+            stats[mode]['seconds'] = time.perf_counter() - started
+        for start_page, end_page in book_pages.values():
+            for _, lines in iter_layout_pages(pdf, start_page, end_page):
+                geometry.update(category for category, _ in lines)
+    finally:
+        pdf.close()
+
+    keys = [PAGE_NUMBER, RUNNING_HEADER, BOOK_HEADER, FOOTNOTE_START, NOTE_CONTINUATION,
+            'inside_note', 'chapter_cleanup']
+    print(f"  {'decisión regex':20s} {'texto':>7s} {'layout':>7s} {'evitadas':>9s}")
+    for key in keys:
+        text_hits, layout_hits = stats['text'][key], stats['layout'][key]
+        print(f"  {key:20s} {text_hits:7d} {layout_hits:7d} {text_hits - layout_hits:9d}")
+    total_text = sum(stats['text'][key] for key in keys)
+    total_layout = sum(stats['layout'][key] for key in keys)
+    print(f"  {'total':20s} {total_text:7d} {total_layout:7d} {total_text - total_layout:9d}")
+    unnecessary = [name for name, *_ in CHAPTER_RULES if rule_hits['text'][name] and not rule_hits['layout'][name]]
+    print(f"  Reglas de capítulo que dejan de dispararse: {len(unnecessary)} de "
+          f"{sum(1 for name, *_ in CHAPTER_RULES if rule_hits['text'][name])}"
+          + (f" ({', '.join(unnecessary)})" if unnecessary else ""))
+    print(f"  Sustituciones de capítulo: texto={sum(rule_hits['text'].values())} "
+          f"layout={sum(rule_hits['layout'].values())}")
+    print(f"  Líneas clasificadas por geometría: "
+          + ", ".join(f"{category}={count}" for category, count in sorted(geometry.items())))
+
+    changed = 0
+    for book_num in book_pages:
+        text_chapters = {ch['chapter']: ch['text'] for ch in results['text'][book_num]}
+        layout_chapters = {ch['chapter']: ch['text'] for ch in results['layout'][book_num]}
+        changed += sum(
+            text_chapters.get(chapter) != layout_chapters.get(chapter)
+            for chapter in set(text_chapters) | set(layout_chapters)
+        )
+    counts = [sum(len(chapters) for chapters in results[mode].values()) for mode in ('text', 'layout')]
+    print(f"  Capítulos: texto={counts[0]} layout={counts[1]}; {changed} con texto distinto")
+    print(f"  Tiempo: texto={stats['text']['seconds']:.2f}s layout={stats['layout']['seconds']:.2f}s")
+    return results
+
+
+def rule_report(pdf_path: str, book_pages: dict, layout: bool = False, repeat: int = 5):
+    """Imprime coincidencias y tiempo acumulado de cada regla de CHAPTER_RULES."""
+    pdf = fitz.open(pdf_path)
+    try:
+        books = [
+            list(iter_page_texts(pdf, start_page, end_page, layout))
+            for start_page, end_page in book_pages.values()
+        ]
+    finally:
+        pdf.close()
+
+    hits = Counter()
+    timings = Counter()
+    for pages in books:
+        list(iter_book_chapters(pages, note_rules=not layout, rule_hits=hits))
+    for _ in range(repeat):
+        for pages in books:
+            list(iter_book_chapters(pages, note_rules=not layout, rule_timings=timings))
+
+    pass_names = {names[0]: names for _, names, *_ in CHAPTER_PASSES}
+    total = sum(timings.values())
+    print(f"  {'pasada':22s} {'ms':>8s} {'%':>6s}  reglas (coincidencias)")
+    for first, names in pass_names.items():
+        elapsed = timings[first] / repeat
+        share = 100 * timings[first] / total if total else 0
+        detail = ", ".join(f"{name}={hits[name]}" for name in names)
+        print(f"  {first:22s} {elapsed * 1000:8.2f} {share:5.1f}%  {detail}")
+    print(f"  {len(CHAPTER_RULES)} reglas en {len(CHAPTER_PASSES)} pasadas; "
+          f"{total / repeat * 1000:.1f} ms por corpus, {sum(hits.values())} coincidencias")
+
+
+def check_clean_text(pdf_path: str, repeat: int = 20) -> bool:
+    """Compara clean_text con la implementación de referencia en los 12 libros.
+
+    Imprime las diferencias (si las hay) y el rendimiento en líneas/segundo
+    de ambas versiones. Devuelve True si la salida es idéntica en todos.
+    """
+    pdf = fitz.open(pdf_path)
+    try:
+        books = {
+            book_num: extract_book_text(pdf, start_page, end_page)
+            for book_num, (start_page, end_page) in sorted(BOOK_PAGES.items())
+        }
+    finally:
+        pdf.close()
+
+    identical = True
+    for book_num, text in books.items():
+        if clean_text(text) != _clean_text_reference(text):
+            identical = False
+            print(f"  Libro {book_num}: la salida DIFIERE de la referencia")
+        else:
+            print(f"  Libro {book_num}: idéntico")
+
+    total_lines = sum(text.count('\n') + 1 for text in books.values()) * repeat
+    for label, func in (("referencia", _clean_text_reference), ("clasificador", clean_text)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for text in books.values():
+                func(text)
+        elapsed = time.perf_counter() - started
+        print(f"  {label:12s}: {total_lines / elapsed:12,.0f} líneas/s")
+
+    return identical
+
+
+def extract_streaming(pdf_path: str, output_path, book_pages=None, layout: bool = False) -> dict:
+    """Extrae todo el PDF en modo streaming y escribe el JSON incrementalmente.
+
+    Devuelve {book_num: número de meditaciones} para las estadísticas, sin
+    retener el corpus en memoria.
+    """
+    summary = {}
+    book_pages = BOOK_PAGES if book_pages is None else book_pages
+
+    def iter_meditations(pdf):
+        meditation_id = 1
+        for book_num, (start_page, end_page) in sorted(book_pages.items()):
+            print(f"\nProcesando Libro {book_num} (páginas {start_page+1}-{end_page})...")
+            count = 0
+            page_texts = iter_page_texts(pdf, start_page, end_page, layout)
+            for ch in iter_book_chapters(page_texts, note_rules=not layout):
+                meditation = {
+                    'id': meditation_id,
+                    'book': book_num,
+                    'chapter': ch['chapter'],
+                    'text': ch['text'],
+                    'themes': []
+                }
+                count += 1
+                meditation_id += 1
+                yield meditation
+            print(f"  Encontrados {count} capítulos")
+            summary[book_num] = count
+
+    pdf = fitz.open(pdf_path)
+    try:
+        write_corpus_stream(output_path, CORPUS_HEADER, iter_meditations(pdf))
+    finally:
+        pdf.close()
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extrae las meditaciones del PDF a JSON.")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="procesos en paralelo, uno por libro (0 = todos los núcleos; por defecto 1)",
+    )
+    parser.add_argument(
+        "--compare-serial", action="store_true",
+        help="ejecuta también en serie, verifica que el resultado es idéntico y muestra la aceleración",
+    )
+    parser.add_argument(
+        "--check-clean-text", action="store_true",
+        help="compara clean_text con la implementación original en los 12 libros y mide líneas/s",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="ignora la caché de texto por página y vuelve a decodificar el PDF",
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true",
+        help="borra la caché de texto por página antes de extraer",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="modo streaming: procesa página a página y escribe el JSON incrementalmente "
+             "(memoria acotada; ignora --jobs y la caché)",
+    )
+    parser.add_argument(
+        "--detect-books", action="store_true",
+        help="sólo detecta los rangos de página de cada libro y los compara con BOOK_PAGES",
+    )
+    parser.add_argument(
+        "--auto-books", action="store_true",
+        help="usa los rangos detectados automáticamente en lugar de la tabla BOOK_PAGES",
+    )
+    parser.add_argument(
+        "--layout", action="store_true",
+        help="descarta notas, headers y folios por geometría (get_text('dict')) antes de las reglas regex",
+    )
+    parser.add_argument(
+        "--layout-report", action="store_true",
+        help="compara el modo texto y el modo layout e informa de las decisiones regex evitadas",
+    )
+    parser.add_argument(
+        "--rule-report", action="store_true",
+        help="muestra coincidencias y tiempo de cada regla de limpieza de capítulos",
+    )
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    profiling.start_from(args, "extract_meditations")
+    jobs = args.jobs or os.cpu_count() or 1
+    if PROFILER.enabled and jobs > 1:
+        print("Aviso: con --jobs > 1 el perfil sólo registra el proceso principal (usa -j 1 para ver cada libro)")
+
     script_dir = Path(__file__).parent
     project_dir = script_dir.parent
     pdf_path = project_dir / "Marco Aurelio-Meditaciones.pdf"
     output_path = project_dir / "src" / "data" / "meditations_extracted.json"
 
-    print(f"Abriendo PDF: {pdf_path}")
-    pdf = fitz.open(str(pdf_path))
+    if args.check_clean_text:
+        print("Verificando clean_text contra la implementación de referencia...")
+        if not check_clean_text(str(pdf_path)):
+            raise SystemExit("ERROR: clean_text difiere de la implementación de referencia")
+        return
 
-    all_meditations = []
-    meditation_id = 1
+    if args.clear_cache and CACHE_DIR.exists():
+        for cache_file in CACHE_DIR.glob('*.json'):
+            cache_file.unlink()
+        print(f"Caché borrada: {CACHE_DIR}")
 
-    for book_num in range(1, 13):
-        start_page, end_page = BOOK_PAGES[book_num]
-        print(f"\nProcesando Libro {book_num} (páginas {start_page+1}-{end_page})...")
+    page_cache = None
+    if not args.no_cache and not args.stream:
+        pdf_hash, page_cache = load_page_cache(str(pdf_path), args.layout)
+        cached_count = len(page_cache)
+
+    book_pages = BOOK_PAGES
+    if args.detect_books or args.auto_books:
+        print("Detectando rangos de página de cada libro...")
+        started = time.perf_counter()
+        detected = detect_book_pages(str(pdf_path), None if args.layout else page_cache)
+        print(f"  {len(detected)} libros detectados en {time.perf_counter() - started:.2f}s")
+        mismatches = report_book_pages(detected, BOOK_PAGES)
+        if args.detect_books:
+            raise SystemExit(1 if mismatches else 0)
+        missing = sorted(set(BOOK_PAGES) - set(detected))
+        if missing:
+            raise SystemExit(f"ERROR: --auto-books no detectó los libros {', '.join(map(str, missing))}; "
+                             "revisa las cabeceras LIBRO o usa la tabla BOOK_PAGES (sin --auto-books)")
+        book_pages = detected
+
+    if args.rule_report:
+        print(f"Reglas de limpieza de capítulos (modo {cache_mode(args.layout)})...")
+        rule_report(str(pdf_path), book_pages, args.layout)
+        return
+
+    if args.layout_report:
+        print("Comparando modo texto y modo layout...")
+        layout_report(str(pdf_path), book_pages)
+        return
+
+    if args.stream:
+        print(f"Abriendo PDF en modo streaming: {pdf_path}")
+        started = time.perf_counter()
+        with PROFILER.stage('stream'):
+            summary = extract_streaming(str(pdf_path), output_path, book_pages, args.layout)
+        elapsed = time.perf_counter() - started
+        total = sum(summary.values())
+        print(f"\n{'='*60}")
+        print(f"Total de meditaciones extraídas: {total} en {elapsed:.2f}s")
+        print("\nMeditaciones por libro:")
+        for book, count in summary.items():
+            print(f"  Libro {book:2d}: {count:3d} meditaciones")
+        print(f"\nJSON guardado en: {output_path}")
+        return
+
+    print(f"Abriendo PDF: {pdf_path} ({jobs} proceso(s))")
+    # La ejecución en serie de --compare-serial parte de la misma caché que la
+    # paralela, no de la que esta acaba de completar
+    loaded_cache = dict(page_cache) if args.compare_serial and page_cache is not None else None
+    started = time.perf_counter()
+    with PROFILER.stage('extract'):
+        chapters_by_book = extract_all_books(str(pdf_path), jobs, page_cache, book_pages, args.layout)
+    elapsed = time.perf_counter() - started
+
+    if page_cache is not None:
+        print(f"Caché de páginas: {cached_count} reutilizadas, {len(page_cache) - cached_count} decodificadas")
+        if len(page_cache) != cached_count:
+            save_page_cache(str(pdf_path), pdf_hash, page_cache, args.layout)
 
-        book_text = extract_book_text(pdf, start_page, end_page)
-        chapters = parse_chapters(book_text, book_num)
+    output_data = build_corpus(chapters_by_book)
+    all_meditations = output_data['meditations']
 
+    for book_num, chapters in chapters_by_book.items():
+        start_page, end_page = book_pages[book_num]
+        print(f"\nProcesando Libro {book_num} (páginas {start_page+1}-{end_page})...")
         print(f"  Encontrados {len(chapters)} capítulos")
 
         # Verificar que los capítulos están en orden correcto
@@ -237,17 +1249,16 @@ def main():
             chapter_nums = [ch['chapter'] for ch in chapters]
             print(f"  Capítulos: {chapter_nums[0]} - {chapter_nums[-1]}")
 
-        for ch in chapters:
-            all_meditations.append({
-                'id': meditation_id,
-                'book': book_num,
-                'chapter': ch['chapter'],
-                'text': ch['text'],
-                'themes': []
-            })
-            meditation_id += 1
-
-    pdf.close()
+    print(f"\nTiempo de extracción: {elapsed:.2f}s con {jobs} proceso(s)")
+    if args.compare_serial:
+        started = time.perf_counter()
+        serial_cache = loaded_cache
+        serial = extract_all_books(str(pdf_path), 1, serial_cache, book_pages, args.layout)
+        serial_elapsed = time.perf_counter() - started
+        if serial != chapters_by_book:
+            raise SystemExit("ERROR: la extracción en paralelo difiere de la ejecución en serie")
+        speedup = serial_elapsed / elapsed if elapsed else float('inf')
+        print(f"Tiempo en serie: {serial_elapsed:.2f}s -> aceleración x{speedup:.2f} (resultado idéntico)")
 
     print(f"\n{'='*60}")
     print(f"Total de meditaciones extraídas: {len(all_meditations)}")
@@ -258,28 +1269,8 @@ def main():
         count = len([m for m in all_meditations if m['book'] == book])
         print(f"  Libro {book:2d}: {count:3d} meditaciones")
 
-    # Crear estructura JSON final
-    output_data = {
-        "author": "Marco Aurelio",
-        "title": "Meditaciones",
-        "description": "Reflexiones del emperador filósofo romano Marco Aurelio (121-180 d.C.)",
-        "themes": [
-            {"id": "virtue", "name": "Virtud", "icon": "⚖️"},
-            {"id": "death", "name": "Muerte y Mortalidad", "icon": "💀"},
-            {"id": "nature", "name": "Naturaleza", "icon": "🌿"},
-            {"id": "duty", "name": "Deber y Responsabilidad", "icon": "🏛️"},
-            {"id": "mind", "name": "Control Mental", "icon": "🧠"},
-            {"id": "time", "name": "Tiempo y Transitoriedad", "icon": "⏳"},
-            {"id": "adversity", "name": "Adversidad", "icon": "🔥"},
-            {"id": "relationships", "name": "Relaciones Humanas", "icon": "🤝"},
-            {"id": "simplicity", "name": "Simplicidad", "icon": "🪨"},
-            {"id": "wisdom", "name": "Sabiduría", "icon": "📜"}
-        ],
-        "meditations": all_meditations
-    }
-
     # Guardar JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with PROFILER.stage('write'), open(output_path, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
 
     print(f"\nJSON guardado en: {output_path}")
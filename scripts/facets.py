@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Facet bitsets for filtering the Meditations corpus by theme and book.
+
+Every facet value (each theme id and each book number) gets a bitset over
+meditation ids: bit `id` is set when the meditation has that theme or belongs
+to that book. Bitsets are stored as arrays of unsigned 32-bit words (bit `id`
+lives in word id // 32, bit id % 32), which JavaScript can AND word by word
+with `a[i] & b[i]`. Any filter combination is then a bitwise AND, instead of
+chaining array filters over the whole corpus. Counts per facet and per
+(theme, book) pair are precomputed.
+
+build_public_data.py writes the artifact as public/data/facets.json. Run
+directly to answer a filter combination and check it against a linear filter:
+
+    python scripts/facets.py --theme death --book 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+
+FACETS_VERSION = 1
+WORD_BITS = 32
+
+
+def to_bitset(ids, size: int) -> list[int]:
+    words = [0] * (size // WORD_BITS + 1)
+    for meditation_id in ids:
+        words[meditation_id // WORD_BITS] |= 1 << (meditation_id % WORD_BITS)
+    return words
+
+
+def bitset_ids(words: list[int]) -> list[int]:
+    return [
+        i * WORD_BITS + bit
+        for i, word in enumerate(words) if word
+        for bit in range(WORD_BITS) if word >> bit & 1
+    ]
+
+
+def bitset_and(first: list[int], *others: list[int]) -> list[int]:
+    result = list(first)
+    for other in others:
+        result = [a & b for a, b in zip(result, other)]
+    return result
+
+
+def build_facets(data: dict) -> dict:
+    meditations = data["meditations"]
+    size = max(m["id"] for m in meditations) + 1
+    theme_ids = [theme["id"] for theme in data.get("themes", [])]
+    books = sorted({m["book"] for m in meditations})
+
+    by_theme = {theme: [] for theme in theme_ids}
+    by_book = {book: [] for book in books}
+    cross = {theme: {book: 0 for book in books} for theme in theme_ids}
+    for meditation in meditations:
+        by_book[meditation["book"]].append(meditation["id"])
+        for theme in meditation["themes"]:
+            by_theme.setdefault(theme, []).append(meditation["id"])
+            cross.setdefault(theme, {book: 0 for book in books})[meditation["book"]] += 1
+
+    return {
+        "version": FACETS_VERSION,
+        "wordBits": WORD_BITS,
+        "size": size,
+        "total": len(meditations),
+        "all": to_bitset((m["id"] for m in meditations), size),
+        "themes": {
+            theme: {"count": len(ids), "bits": to_bitset(ids, size)} for theme, ids in by_theme.items()
+        },
+        "books": {
+            str(book): {"count": len(ids), "bits": to_bitset(ids, size)} for book, ids in by_book.items()
+        },
+        # Meditations per (theme, book), books in the order of "books"
+        "themeBookCounts": {theme: [counts[book] for book in books] for theme, counts in cross.items()},
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Answer a facet filter with bitsets and check it against a linear filter.")
+    parser.add_argument("--theme", action="append", default=[], help="theme id (repeat to require several)")
+    parser.add_argument("--book", type=int, action="append", default=[], help="book number")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    data = json.loads(args.data.read_text(encoding="utf-8"))
+    facets = build_facets(data)
+    size = len(json.dumps(facets, separators=(",", ":")))
+    print(f"Facets: {len(facets['themes'])} themes, {len(facets['books'])} books, {size:,d} bytes")
+
+    started = time.perf_counter()
+    selected = [facets["themes"][theme]["bits"] for theme in args.theme]
+    selected += [facets["books"][str(book)]["bits"] for book in args.book]
+    ids = bitset_ids(bitset_and(facets["all"], *selected))
+    bitset_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [
+        m["id"] for m in data["meditations"]
+        if all(theme in m["themes"] for theme in args.theme) and all(m["book"] == book for book in args.book)
+    ]
+    filter_seconds = time.perf_counter() - started
+
+    print(f"Bitsets: {len(ids)} matches in {bitset_seconds * 1000:.3f} ms; "
+          f"linear filter: {len(expected)} matches in {filter_seconds * 1000:.3f} ms")
+    if ids != expected:
+        print("WARNING: bitsets and linear filter disagree")
+        return 1
+    print(f"Ids: {ids[:20]}{' ...' if len(ids) > 20 else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
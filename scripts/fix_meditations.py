@@ -4,8 +4,18 @@ Script to fix truncated meditations with manually verified corrections.
 Extended version with comprehensive fixes.
 """
 
+import argparse
+import difflib
 import json
 import re
+from pathlib import Path
+
+import profiling
+from ocr_rules import VERSION_FIELD, apply_passes, apply_rules, cleanup_rules, compile_ocr_rules, load_ocr_rules
+from profiling import PROFILER
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
 
 def load_meditations(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -14,6 +24,7 @@ def load_meditations(filepath):
 def save_meditations(filepath, data):
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
 
 # Manually verified corrections
 CORRECTIONS = {
@@ -122,75 +133,113 @@ CORRECTIONS = {
     (12, 34): """Lo que más incita a despreciar la muerte es el hecho de que los que juzgan el placer un bien y el dolor un mal, la despreciaron, sin embargo, también.""",
 }
 
+# OCR cleanup rules, shared with audit_corpus.py (see ocr_rules.json)
+OCR_RULES_VERSION, _RULES = load_ocr_rules()
+OCR_RULES = cleanup_rules(_RULES)
+OCR_PASSES = compile_ocr_rules(OCR_RULES)
+
 def clean_ocr_artifacts(text):
     """Remove OCR artifacts from text."""
-    # Fix Greek phi character in Spanish words
-    text = text.replace('soφ', 'sor')
-    text = text.replace('cueφ', 'cuerp')
-    text = text.replace('φ', '')
-    text = text.replace('fiiente', 'fuente')
-    text = text.replace('rñe', 'me')
-
-    # Remove MliDIT errors (including with spaces)
-    text = re.sub(r'\s*MliDIT\s*A?\s*CIONli\s*S\s*', ' ', text)
-    text = re.sub(r'\s*MliDITACIONLS\s*', ' ', text)
-    text = re.sub(r'\s*Mlii:\)ITACK\)NLS\s*', ' ', text)
-    text = re.sub(r'tambiénMliDIT\s*ACIONli\s*S', 'también', text)
-
-    # Remove footnote content with LIBRO references and page numbers
-    text = re.sub(r'LIBRO\s+[IVX]+\s*\d+\s*', '', text)
-    text = re.sub(r'L\s*I\s*B\s*R\s*O\s+[IVX]+\s*\d*\s*', '', text)
-
-    # Remove LIBRO references at end of text
-    text = re.sub(r'\s*L\s*I\s*B\s*R\s*O\s+X+I*\s*$', '', text)
-    text = re.sub(r'\s*LIBRO\s+[IVX]+\s*$', '', text)
-
-    # Remove common footnote patterns
-    text = re.sub(r'Palabras de [^\.]+\.\s*', '', text)
-    text = re.sub(r'De igual modo procede [^\.]+\.\s*', '', text)
-    text = re.sub(r'A\.\s*I\.\s*Trannoy[^\.]+\.\s*', '', text)
-    text = re.sub(r'Farquharson[^\.]+\.\s*', '', text)
-    text = re.sub(r'«mi hermano»[^\.]+\.\s*', '', text)
-
-    # Remove page numbers at end
-    text = re.sub(r'\s+\d{1,3}\s*$', '', text)
-
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def main():
-    print("Loading meditations...")
-    data = load_meditations('/home/user/EstoicApp/src/data/meditations.json')
-
-    fixes_made = 0
-    cleanups_made = 0
-
-    print("\nApplying corrections...")
-
+    if PROFILER.enabled:
+        return apply_passes(OCR_PASSES, text, *PROFILER.rules("ocr"))
+    return apply_passes(OCR_PASSES, text)
+
+def _clean_ocr_artifacts_reference(text):
+    """Rule-by-rule implementation, kept for --check-rules."""
+    return apply_rules(OCR_RULES, text)
+
+def apply_fixes(data):
+    """Apply manual corrections and OCR cleanup in place.
+
+    Every text, corrected or not, goes through the OCR rules, and every
+    meditation is stamped with OCR_RULES_VERSION. Returns a list of
+    (meditation, old_text, action) with action 'corrected' or 'cleaned' for
+    every meditation whose text actually changed.
+    """
+    changes = []
     for meditation in data['meditations']:
         key = (meditation['book'], meditation['chapter'])
         old_text = meditation['text']
 
-        # Check if we have a manual correction
+        # Check if we have a manual correction, then clean OCR artifacts
         if key in CORRECTIONS:
-            meditation['text'] = CORRECTIONS[key]
-            fixes_made += 1
-            print(f"Corrected Book {meditation['book']}, Chapter {meditation['chapter']}")
+            new_text, action = clean_ocr_artifacts(CORRECTIONS[key]), 'corrected'
         else:
-            # Try to clean OCR artifacts
-            cleaned = clean_ocr_artifacts(old_text)
-            if cleaned != old_text:
-                meditation['text'] = cleaned
-                cleanups_made += 1
-                print(f"Cleaned Book {meditation['book']}, Chapter {meditation['chapter']}")
+            new_text, action = clean_ocr_artifacts(old_text), 'cleaned'
+        if new_text != old_text:
+            meditation['text'] = new_text
+            changes.append((meditation, old_text, action))
+        meditation[VERSION_FIELD] = OCR_RULES_VERSION
+    return changes
+
+def _sentences(text):
+    return re.split(r'(?<=[.;:?!])\s+', text)
+
+def print_diff(meditation, old_text):
+    label = f"id={meditation['id']} book={meditation['book']} chapter={meditation['chapter']}"
+    for line in difflib.unified_diff(_sentences(old_text), _sentences(meditation['text']),
+                                     f"a/{label}", f"b/{label}", lineterm='', n=1):
+        print(line)
+
+def check_rules(data):
+    """Compare the compiled passes with the rule-by-rule reference on every row."""
+    mismatches = [
+        m['id'] for m in data['meditations']
+        if clean_ocr_artifacts(m['text']) != _clean_ocr_artifacts_reference(m['text'])
+    ]
+    print(f"OCR rules v{OCR_RULES_VERSION}: {len(OCR_RULES)} rules in {len(OCR_PASSES)} passes; "
+          f"{len(data['meditations']) - len(mismatches)}/{len(data['meditations'])} rows identical to the reference")
+    for meditation_id in mismatches:
+        print(f"  MISMATCH id={meditation_id}")
+    return not mismatches
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply manual corrections and OCR cleanup to the corpus.")
+    parser.add_argument('input', nargs='?', type=Path, default=DATA_PATH,
+                        help="corpus JSON to fix (default: src/data/meditations.json)")
+    parser.add_argument('-o', '--output', type=Path, help="where to write the result (default: input)")
+    parser.add_argument('--dry-run', action='store_true', help="report the changes without writing")
+    parser.add_argument('--diff', action='store_true', help="print a sentence-level diff of every changed row")
+    parser.add_argument('--check-rules', action='store_true',
+                        help="check the compiled rule passes against the rule-by-rule reference and exit")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    profiling.start_from(args, "fix_meditations")
+    output_path = args.output or args.input
+    print(f"Loading meditations from {args.input}...")
+    with PROFILER.stage("load"):
+        data = load_meditations(args.input)
+
+    if args.check_rules:
+        raise SystemExit(0 if check_rules(data) else 1)
+
+    print("\nApplying corrections...")
+    unstamped = sum(1 for m in data['meditations'] if m.get(VERSION_FIELD) != OCR_RULES_VERSION)
+    with PROFILER.stage("fix"):
+        changes = apply_fixes(data)
+    for meditation, old_text, action in changes:
+        print(f"{action.capitalize()} Book {meditation['book']}, Chapter {meditation['chapter']}")
+        if args.diff:
+            print_diff(meditation, old_text)
+
+    fixes_made = sum(1 for change in changes if change[2] == 'corrected')
+    cleanups_made = len(changes) - fixes_made
 
     print(f"\nTotal corrections: {fixes_made}")
     print(f"Total cleanups: {cleanups_made}")
-
-    if fixes_made > 0 or cleanups_made > 0:
-        print(f"\nSaving changes...")
-        save_meditations('/home/user/EstoicApp/src/data/meditations.json', data)
+    print(f"OCR rules v{OCR_RULES_VERSION} stamped on {unstamped} meditations")
+
+    if args.dry_run:
+        print("\nDry run: nothing written.")
+    elif not changes and not unstamped and output_path == args.input:
+        print(f"\nNo changes; {output_path} left untouched.")
+    else:
+        print(f"\nSaving changes to {output_path}...")
+        with PROFILER.stage("save"):
+            save_meditations(output_path, data)
         print("Done!")
 
 if __name__ == '__main__':
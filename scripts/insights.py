@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Precomputed "Profundizar" insights for every meditation.
+
+MeditationCard used to derive the insight panel at render time: pick the
+primary theme (the meditation's first theme, "wisdom" if it has none), look up
+the theme's label, exercise, question and mantra, and split the text into
+sentences to quote the first one. This module computes the same fields for the
+whole corpus in one batch and writes them to src/data/insights.json:
+
+    {"version": N,
+     "themes": {theme: {"themeText", "essence", "exercise", "journalQuestion", "mantra"}},
+     "meditations": {id: {"primaryTheme", "plainReading"}}}
+
+The theme fields are stored once per theme; the app merges them with the
+meditation's entry (getStoicInsight in src/utils/stoicLens.js), so rendering
+a card is a lookup. A content hash of each entry's text and primary theme is
+kept out of the shipped file, in .cache/insights.json: a rebuild only
+regenerates entries whose hash changed, and --check fails when the file is
+stale. pipeline.py rewrites the file with the corpus (its "insights" stage),
+and build_public_data.py ships the same artifact as public/data/insights.json.
+
+    python scripts/insights.py          # update src/data/insights.json
+    python scripts/insights.py --check  # exit 1 if it is out of date
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+INSIGHTS_PATH = ROOT / "src" / "data" / "insights.json"
+# Build cache: {"output", "file", "hashes"}: the path and SHA-256 of the last
+# file written and the content hash of each of its entries
+HASHES_PATH = ROOT / ".cache" / "insights.json"
+
+# Bump when the derivation below changes, so every entry is regenerated
+INSIGHTS_VERSION = 1
+DEFAULT_THEME = "wisdom"
+DEFAULT_THEME_TEXT = "práctica estoica"
+READING_LIMIT = 220
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+EDGE_QUOTES = re.compile(r'^"|"\Z')
+
+THEME_LABELS = {
+    "virtue": "virtud práctica",
+    "death": "memento mori",
+    "nature": "vivir de acuerdo con la naturaleza",
+    "duty": "deber y servicio",
+    "mind": "dominio del juicio",
+    "time": "uso del tiempo",
+    "adversity": "resistencia ante la adversidad",
+    "relationships": "trato con los demás",
+    "simplicity": "sencillez",
+    "wisdom": "sabiduría aplicada",
+}
+
+EXERCISES = {
+    "virtue": "Elige una acción pequeña que harías aunque nadie la viera. Hazla sin anunciarla.",
+    "death": "Recuerda durante un minuto que el día no se repite. Decide qué merece realmente tu atención.",
+    "nature": "Distingue lo que depende de ti de lo que pertenece al curso natural de las cosas.",
+    "duty": "Haz la siguiente tarea necesaria sin negociar con la pereza ni buscar aplauso.",
+    "mind": "Antes de reaccionar, nombra tu juicio: “estoy interpretando esto como…”. Luego decide si merece asentimiento.",
+    "time": "Quita una distracción concreta de la próxima hora y dedícala a algo que no te avergüence recordar.",
+    "adversity": "Convierte una molestia de hoy en entrenamiento: paciencia, precisión o templanza.",
+    "relationships": "Trata a alguien difícil como a un familiar racional que todavía no ve bien lo bueno.",
+    "simplicity": "Reduce una necesidad artificial hoy: compra, pantalla, explicación o queja.",
+    "wisdom": "Resume la idea en una regla de conducta de una sola frase y aplícala antes de dormir.",
+}
+
+QUESTIONS = {
+    "virtue": "¿Qué virtud concreta me está pidiendo practicar este pasaje?",
+    "death": "Si hoy terminara el capítulo, ¿qué reacción mía parecería ridícula o innecesaria?",
+    "nature": "¿Qué estoy intentando controlar que no me pertenece?",
+    "duty": "¿Cuál es mi deber sencillo aquí, sin drama ni autoengaño?",
+    "mind": "¿Qué juicio automático puedo suspender antes de convertirlo en emoción?",
+    "time": "¿Qué uso de mi tiempo de hoy me acerca a una vida más sobria y entera?",
+    "adversity": "¿Qué músculo moral entrena esta incomodidad?",
+    "relationships": "¿Cómo respondería si priorizara carácter sobre orgullo?",
+    "simplicity": "¿Qué sobra en mi día y me debilita sin que lo note?",
+    "wisdom": "¿Qué frase de este texto podría llevar conmigo como recordatorio operativo?",
+}
+
+MANTRAS = {
+    "virtue": "Sé recto, no espectacular.",
+    "death": "Esto también pasa; úsalo bien.",
+    "nature": "Acepta el hecho; gobierna la respuesta.",
+    "duty": "Haz lo que toca, como toca.",
+    "mind": "No eres la impresión: eres quien la examina.",
+    "time": "Sólo posees este instante.",
+    "adversity": "El obstáculo revela el entrenamiento.",
+    "relationships": "Nacimos para colaborar.",
+    "simplicity": "Menos ruido, más carácter.",
+    "wisdom": "Comprender es practicar.",
+}
+
+
+def essence(theme_text: str) -> str:
+    return (f"Este pasaje apunta a {theme_text}: no busca inspirar un estado de ánimo, "
+            "sino entrenar una forma de responder.")
+
+
+def primary_theme(meditation: dict) -> str:
+    themes = meditation.get("themes") or []
+    return themes[0] if themes and themes[0] else DEFAULT_THEME
+
+
+def theme_insight(theme: str) -> dict:
+    """The fields shared by every meditation whose primary theme is `theme`."""
+    theme_text = THEME_LABELS.get(theme, DEFAULT_THEME_TEXT)
+    return {
+        "themeText": theme_text,
+        "essence": essence(theme_text),
+        "exercise": EXERCISES.get(theme, EXERCISES[DEFAULT_THEME]),
+        "journalQuestion": QUESTIONS.get(theme, QUESTIONS[DEFAULT_THEME]),
+        "mantra": MANTRAS.get(theme, MANTRAS[DEFAULT_THEME]),
+    }
+
+
+def utf16_truncate(text: str, limit: int) -> str:
+    """text[:limit] counting UTF-16 code units, like String.prototype.slice."""
+    return text.encode("utf-16-le")[:limit * 2].decode("utf-16-le", errors="ignore")
+
+
+def plain_reading(text: str) -> str:
+    """First sentence without edge quotes, cut to READING_LIMIT UTF-16 units."""
+    sentence = EDGE_QUOTES.sub("", SENTENCE_SPLIT.split(text, maxsplit=1)[0]) or text
+    if len(sentence.encode("utf-16-le")) // 2 > READING_LIMIT:
+        return utf16_truncate(sentence, READING_LIMIT - 3) + "…"
+    return sentence
+
+
+def content_hash(text: str, theme: str) -> str:
+    key = f"{INSIGHTS_VERSION}\0{theme}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def build_insights(meditations: list[dict], previous: dict | None = None,
+                   hashes: dict | None = None) -> tuple[dict, dict, int]:
+    """(insights artifact, {id: content hash}, number of regenerated entries).
+
+    Entries of `previous` are reused when `hashes` (the hashes they were
+    built from) says their text and primary theme are unchanged.
+    """
+    reusable = (previous or {}).get("meditations", {})
+    hashes = hashes or {}
+    entries = {}
+    digests = {}
+    themes = {DEFAULT_THEME: None}  # the app's fallback for unknown ids
+    regenerated = 0
+    for meditation in meditations:
+        key = str(meditation["id"])
+        text = meditation.get("text") or ""
+        theme = primary_theme(meditation)
+        digests[key] = content_hash(text, theme)
+        entry = reusable.get(key)
+        if not entry or hashes.get(key) != digests[key]:
+            entry = {"primaryTheme": theme, "plainReading": plain_reading(text)}
+            regenerated += 1
+        entries[key] = entry
+        themes.setdefault(theme, None)
+    return {
+        "version": INSIGHTS_VERSION,
+        "themes": {theme: theme_insight(theme) for theme in sorted(themes)},
+        "meditations": entries,
+    }, digests, regenerated
+
+
+def full_insight(insights: dict, meditation_id: int) -> dict:
+    """Merge the theme fields into one entry, as getStoicInsight does in the app."""
+    entry = insights["meditations"][str(meditation_id)]
+    return {"primaryTheme": entry["primaryTheme"], **insights["themes"][entry["primaryTheme"]],
+            "plainReading": entry["plainReading"]}
+
+
+def load_insights(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_insights(path: Path, insights: dict) -> bool:
+    """Write the artifact with indent=2 unless the file already holds it; returns whether it changed."""
+    if load_insights(path) == insights:
+        return False
+    path.write_text(json.dumps(insights, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return True
+
+
+def file_digest(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def load_hashes(output: Path) -> dict:
+    """The content hashes the entries of `output` were built from, if the cache describes
+    that file as it is now (the pipeline also writes it)."""
+    cache = load_insights(HASHES_PATH) or {}
+    if cache.get("output") != str(output.resolve()) or cache.get("file") != file_digest(output):
+        return {}
+    return cache.get("hashes", {})
+
+
+def save_hashes(output: Path, hashes: dict) -> None:
+    HASHES_PATH.parent.mkdir(parents=True, exist_ok=True)
+    cache = {"output": str(output.resolve()), "file": file_digest(output), "hashes": hashes}
+    HASHES_PATH.write_text(json.dumps(cache, separators=(",", ":")) + "\n", encoding="utf-8")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Precompute the insight panel of every meditation.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON")
+    parser.add_argument("--output", type=Path, default=INSIGHTS_PATH, help="insights JSON to update")
+    parser.add_argument("--check", action="store_true", help="don't write; exit 1 if the output is out of date")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    meditations = json.loads(args.data.read_text(encoding="utf-8"))["meditations"]
+    previous = load_insights(args.output)
+    insights, hashes, regenerated = build_insights(meditations, previous, load_hashes(args.output))
+    stale = insights != previous
+    print(f"{len(insights['meditations'])} insights, {len(insights['themes'])} themes: "
+          f"{regenerated} regenerated, {len(meditations) - regenerated} reused")
+    if args.check:
+        if stale:
+            print(f"{args.output} is out of date: run scripts/insights.py")
+        return 1 if stale else 0
+    if write_insights(args.output, insights):
+        print(f"Written to {args.output}")
+    else:
+        print(f"{args.output} unchanged")
+    save_hashes(args.output, hashes)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
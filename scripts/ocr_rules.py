@@ -0,0 +1,191 @@
+"""Shared, versioned OCR rules for the Meditations corpus.
+
+The rules live in scripts/ocr_rules.json: a version number and an ordered
+list of {name, kind, pattern, replacement[, audit]} entries. Kinds:
+
+- literal: plain substring replacement.
+- alt: regular expression; consecutive alt rules share one search guard and
+  only run when some rule of the group can match.
+- sub: regular expression applied to every text.
+- audit: detection only (no replacement), used by audit_corpus.py.
+
+fix_meditations.py applies the rules at build time and stamps every
+meditation with the rule version ("ocrRulesVersion"), so the app receives
+text that is already clean. audit_corpus.py builds its OCR checks from the
+rules that carry an "audit" key, so detection and cleanup can't drift apart.
+Bump the version whenever a rule changes.
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+from pathlib import Path
+
+RULES_PATH = Path(__file__).resolve().parent / "ocr_rules.json"
+
+VERSION_FIELD = "ocrRulesVersion"
+KINDS = ("literal", "alt", "sub", "audit")
+
+
+def load_ocr_rules(path: Path = RULES_PATH) -> tuple[int, list[dict]]:
+    """(version, rules) from the rule file, checking kinds and unique names."""
+    document = json.loads(path.read_text(encoding="utf-8"))
+    rules = document["rules"]
+    names = set()
+    for rule in rules:
+        if rule["kind"] not in KINDS:
+            raise ValueError(f"{path}: rule {rule['name']!r} has unknown kind {rule['kind']!r}")
+        if rule["name"] in names:
+            raise ValueError(f"{path}: duplicate rule name {rule['name']!r}")
+        names.add(rule["name"])
+    return document["version"], rules
+
+
+def cleanup_rules(rules: list[dict]) -> list[tuple[str, str, str, str]]:
+    """(name, kind, pattern, replacement) for every rule that rewrites text, in order."""
+    return [
+        (rule["name"], rule["kind"], rule["pattern"], rule["replacement"])
+        for rule in rules if rule["kind"] != "audit"
+    ]
+
+
+def audit_patterns(rules: list[dict]) -> dict[str, list[re.Pattern]]:
+    """Audit check name -> compiled patterns of the rules feeding it, in file order."""
+    checks: dict[str, list[re.Pattern]] = {}
+    for rule in rules:
+        if "audit" in rule:
+            pattern = re.escape(rule["pattern"]) if rule["kind"] == "literal" else rule["pattern"]
+            checks.setdefault(rule["audit"], []).append(re.compile(pattern))
+    return checks
+
+
+def _overlaps(first, second):
+    """True if a proper suffix of first is a proper prefix of second."""
+    return any(first.endswith(second[:k]) for k in range(1, min(len(first), len(second))))
+
+
+def _literal_conflict(earlier, later):
+    """True if `later` must run after (earlier literal, replacement) instead of with it."""
+    literal, replacement = earlier
+    return (
+        (literal in later and literal != later)        # earlier rule rewrites part of later's match
+        or _overlaps(literal, later) or _overlaps(later, literal)
+        or later in replacement                         # replacement creates a later match...
+        or _overlaps(replacement, later) or _overlaps(later, replacement)
+        or (not replacement and len(later) > 1)         # ...or a deletion joins one
+    )
+
+
+def compile_ocr_rules(rules):
+    """Group (name, kind, pattern, replacement) rules into passes of (kind, names, payload).
+
+    payload is (regex, {literal: replacement}) for literal passes,
+    (alternation, [(regex, replacement)]) for "alt" groups and
+    (regex, replacement) for single substitutions.
+    """
+    passes = []
+    for name, kind, pattern, replacement in rules:
+        previous = passes[-1] if passes else None
+        if kind == "literal" and previous and previous[0] == "literal" and not any(
+                _literal_conflict((literal, repl), pattern) for _, literal, repl in previous[2]):
+            previous[1].append(name)
+            previous[2].append((name, pattern, replacement))
+        elif kind == "alt" and previous and previous[0] == "alt":
+            previous[1].append(name)
+            previous[2].append((name, pattern, replacement))
+        else:
+            passes.append([kind, [name], [(name, pattern, replacement)]])
+
+    compiled = []
+    for kind, names, rules_in_pass in passes:
+        if kind == "literal":
+            table = {literal: replacement for _, literal, replacement in rules_in_pass}
+            # Longest literals first, so none hides another starting at the same place
+            alternation = "|".join(re.escape(literal) for literal in sorted(table, key=len, reverse=True))
+            payload = (re.compile(alternation), table)
+        elif kind == "alt":
+            # A leading \s* can match empty, so dropping it doesn't change
+            # whether a rule matches somewhere, and lets re skip ahead on the
+            # first literal character of each rule
+            alternation = "|".join("(?:" + regex.removeprefix(r"\s*") + ")" for _, regex, _ in rules_in_pass)
+            payload = (re.compile(alternation),
+                       [(re.compile(regex), replacement) for _, regex, replacement in rules_in_pass])
+        else:
+            _, regex, replacement = rules_in_pass[0]
+            payload = (re.compile(regex), replacement)
+        compiled.append((kind, names, payload))
+    return compiled
+
+
+def apply_passes(passes, text, hits=None, timings=None, calls=None):
+    """Run compiled passes over text and strip the result.
+
+    If Counters are given, hits accumulates the matches of each rule, and
+    timings and calls the time and runs of each pass (by its first rule),
+    except in "alt" groups, where every regex is timed and counted under its
+    own name and the shared search guard under guard_name(names).
+    """
+    if hits is not None:
+        return _apply_passes_counted(passes, text, hits, timings, calls)
+    for kind, _, (pattern, replacement) in passes:
+        if kind == "literal":
+            if any(literal in text for literal in replacement):
+                text = pattern.sub(lambda m: replacement[m.group()], text)
+        elif kind == "alt":
+            if pattern.search(text):
+                for regex, rule_replacement in replacement:
+                    text = regex.sub(rule_replacement, text)
+        else:
+            text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def guard_name(names):
+    """Counter name of the shared search guard of an "alt" group."""
+    return f"{names[0]}..{names[-1]}:guard"
+
+
+def _apply_passes_counted(passes, text, hits, timings, calls):
+    """apply_passes filling the profiling counters; kept apart so the plain path stays lean."""
+    for kind, names, (pattern, replacement) in passes:
+        started = time.perf_counter()
+        if kind == "alt":
+            # The guard and every regex of the group are counted on their own,
+            # so the report shows which pattern dominates
+            guard = guard_name(names)
+            found = pattern.search(text)
+            timings[guard] += time.perf_counter() - started
+            calls[guard] += 1
+            hits[guard] += found is not None
+            if found:
+                for name, (regex, rule_replacement) in zip(names, replacement):
+                    started = time.perf_counter()
+                    text, count = regex.subn(rule_replacement, text)
+                    timings[name] += time.perf_counter() - started
+                    calls[name] += 1
+                    hits[name] += count
+            continue
+        if kind == "literal":
+            if any(literal in text for literal in replacement):
+                names_by_literal = dict(zip(replacement, names))
+                def replace_literal(m):
+                    hits[names_by_literal[m.group()]] += 1
+                    return replacement[m.group()]
+                text = pattern.sub(replace_literal, text)
+        else:
+            text, count = pattern.subn(replacement, text)
+            hits[names[0]] += count
+        timings[names[0]] += time.perf_counter() - started
+        calls[names[0]] += 1
+    return text.strip()
+
+
+def apply_rules(rules, text):
+    """Rule-by-rule reference implementation of apply_passes."""
+    for _, kind, pattern, replacement in rules:
+        if kind == "literal":
+            text = text.replace(pattern, replacement)
+        else:
+            text = re.sub(pattern, replacement, text)
+    return text.strip()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Run the corpus scripts as one cached pipeline: extract -> fix -> themes -> audit, spell, insights.
+
+Each stage is a node in a small DAG. Its key hashes the stage name, the hashes
+of its inputs and the source of the scripts it runs; when the key matches the
+previous run, the stage is skipped and its output is taken from the cache in
+.cache/pipeline. The corpus is passed between stages in memory, and the final
+corpus is only written (with the usual indent=2) when its content changed.
+
+By default the pipeline starts from the curated src/data/meditations.json and
+writes it back, together with the src/data/insights.json the app bundles
+(insights.py), so the two never drift apart. With --from-pdf it starts by
+extracting the PDF and writes src/data/meditations_extracted.json instead,
+like extract_meditations.py, and leaves the insights alone.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import assign_themes
+import audit_corpus
+import fix_meditations
+import insights
+import profiling
+import spellcheck
+from profiling import PROFILER
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+PDF_PATH = ROOT / "Marco Aurelio-Meditaciones.pdf"
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+EXTRACTED_PATH = ROOT / "src" / "data" / "meditations_extracted.json"
+CACHE_DIR = ROOT / ".cache" / "pipeline"
+STATE_PATH = CACHE_DIR / "state.json"
+OBJECTS_DIR = CACHE_DIR / "objects"
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    return sha256_hex(path.read_bytes())
+
+
+def encode_value(value) -> tuple[str, str]:
+    """Compact JSON blob of a stage output and its content hash."""
+    blob = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return sha256_hex(blob.encode("utf-8")), blob
+
+
+def object_path(value_hash: str) -> Path:
+    return OBJECTS_DIR / f"{value_hash}.json"
+
+
+def artifact(value_hash: str, load) -> dict:
+    """A stage input/output: its hash plus a memoized loader for the value."""
+    return {"hash": value_hash, "load": functools.cache(load)}
+
+
+def cached_artifact(value_hash: str) -> dict:
+    return artifact(value_hash, lambda: json.loads(object_path(value_hash).read_text(encoding="utf-8")))
+
+
+def copy_corpus(data: dict) -> dict:
+    """Copy the corpus down to each row, so a stage can edit rows without touching its input."""
+    return {**data, "meditations": [dict(row) for row in data["meditations"]]}
+
+
+def run_extract(pdf_path: Path, jobs: int = 1) -> dict:
+    import extract_meditations  # needs PyMuPDF, only imported when the stage runs
+    return extract_meditations.extract_corpus(str(pdf_path), jobs)
+
+
+def run_fix(corpus: dict) -> dict:
+    corpus = copy_corpus(corpus)
+    fix_meditations.apply_fixes(corpus)
+    return corpus
+
+
+def run_themes(corpus: dict) -> dict:
+    corpus = copy_corpus(corpus)
+    assign_themes.apply_themes(corpus["meditations"])
+    return corpus
+
+
+def run_audit(corpus: dict) -> dict:
+    rows = corpus["meditations"]
+    hits = audit_corpus.audit_rows(rows)
+    pairs = audit_corpus.near_duplicate_pairs(rows)
+    return {"summary": audit_corpus.summarize(rows, hits, pairs), "hits": hits, "pairs": pairs}
+
+
+def run_spell(corpus: dict) -> dict:
+    rows = corpus["meditations"]
+    flags = spellcheck.detect(rows, spellcheck.build_speller(rows))
+    return {"summary": spellcheck.summarize(flags), "flags": flags}
+
+
+def run_insights(corpus: dict) -> dict:
+    return insights.build_insights(corpus["meditations"])[0]
+
+
+def build_stages(from_pdf: bool) -> dict:
+    """Stage name -> (input names, scripts in the stage key, function), in topological order."""
+    stages = {}
+    if from_pdf:
+        stages["extract"] = (["pdf"], ["extract_meditations.py"], run_extract)
+    stages["fix"] = (["extract" if from_pdf else "corpus"], ["fix_meditations.py", "ocr_rules.py", "ocr_rules.json"], run_fix)
+    stages["themes"] = (["fix"], ["assign_themes.py"], run_themes)
+    stages["audit"] = (["themes"], ["audit_corpus.py", "ocr_rules.py", "ocr_rules.json"], run_audit)
+    stages["spell"] = (["themes"], ["spellcheck.py", "fix_meditations.py"], run_spell)
+    stages["insights"] = (["themes"], ["insights.py"], run_insights)
+    return stages
+
+
+def source_artifacts(from_pdf: bool, data_path: Path) -> dict:
+    if from_pdf:
+        return {"pdf": artifact(file_hash(PDF_PATH), lambda: PDF_PATH)}
+    return {"corpus": artifact(file_hash(data_path), lambda: json.loads(data_path.read_text(encoding="utf-8")))}
+
+
+def load_state() -> dict:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    """Persist the state and drop cached outputs no stage refers to anymore."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, indent=2) + "\n", encoding="utf-8")
+    live = {entry["output"] for name, entry in state.items() if name != "written"}
+    for path in OBJECTS_DIR.glob("*.json"):
+        if path.stem not in live:
+            path.unlink()
+
+
+def run_pipeline(stages: dict, artifacts: dict, state: dict, force: set, jobs: int = 1) -> list:
+    """Run or skip every stage; returns [(stage, status, seconds)]."""
+    pipeline_hash = file_hash(Path(__file__))
+    timings = []
+    for name, (inputs, scripts, func) in stages.items():
+        started = time.perf_counter()
+        key_parts = [name, pipeline_hash]
+        key_parts += [artifacts[source]["hash"] for source in inputs]
+        key_parts += [file_hash(SCRIPTS_DIR / script) for script in scripts]
+        key = sha256_hex("\0".join(key_parts).encode("utf-8"))
+
+        previous = state.get(name)
+        if (name not in force and previous and previous["key"] == key
+                and object_path(previous["output"]).exists()):
+            artifacts[name] = cached_artifact(previous["output"])
+            status = "cached"
+        else:
+            args = [artifacts[source]["load"]() for source in inputs]
+            with PROFILER.stage(name):
+                value = func(*args, jobs) if func is run_extract else func(*args)
+            value_hash, blob = encode_value(value)
+            path = object_path(value_hash)
+            if not path.exists():
+                OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+                path.write_text(blob, encoding="utf-8")
+            artifacts[name] = artifact(value_hash, lambda value=value: value)
+            state[name] = {"key": key, "output": value_hash}
+            status = "ran"
+        timings.append((name, status, time.perf_counter() - started))
+    return timings
+
+
+def write_corpus(output_path: Path, corpus: dict, state: dict) -> bool:
+    """Write the final corpus as fix_meditations.save_meditations does (indent=2 and a
+    final newline) unless the file already holds exactly those bytes."""
+    written = state.get("written", {})
+    if (written.get("path") == str(output_path) and written.get("corpus") == corpus["hash"]
+            and output_path.exists() and file_hash(output_path) == written.get("file")):
+        return False
+    content = (json.dumps(corpus["load"](), ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+    changed = not output_path.exists() or output_path.read_bytes() != content
+    if changed:
+        output_path.write_bytes(content)
+    state["written"] = {"path": str(output_path), "corpus": corpus["hash"], "file": file_hash(output_path)}
+    return changed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run extract -> fix -> themes -> audit, spell, insights, skipping unchanged stages.")
+    parser.add_argument("--from-pdf", action="store_true", help="start from the PDF instead of the curated corpus")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="source corpus when not using --from-pdf")
+    parser.add_argument("--output", type=Path,
+                        help="where to write the final corpus (default: --data, or meditations_extracted.json with --from-pdf)")
+    parser.add_argument("--no-write", action="store_true",
+                        help="run the stages but don't write the final corpus or the insights")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help="re-run STAGE even if its inputs are unchanged ('all' for every stage)")
+    parser.add_argument("--audit-jsonl", metavar="PATH", help="write the audit hits and pairs as JSONL")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for the extract stage")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    profiling.start_from(args, "pipeline")
+    stages = build_stages(args.from_pdf)
+    force = set(stages) if "all" in args.force else set(args.force)
+    unknown = force - set(stages)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    output_path = args.output or (EXTRACTED_PATH if args.from_pdf else args.data)
+
+    state = load_state()
+    artifacts = source_artifacts(args.from_pdf, args.data)
+    started = time.perf_counter()
+    timings = run_pipeline(stages, artifacts, state, force, args.jobs)
+
+    print(f"{'stage':8s} {'status':7s} {'time':>8s}")
+    for name, status, seconds in timings:
+        print(f"{name:8s} {status:7s} {seconds:7.2f}s")
+
+    audit = artifacts["audit"]["load"]()
+    summary = audit["summary"]
+    print(f"\nAudit: {summary['total_hits']} hits in {summary['flagged_rows']} of {summary['rows']} rows")
+    for name, counts in summary["checks"].items():
+        print(f"  {name}: {counts['rows']}")
+    for name, count in summary["pairs"].items():
+        print(f"  {name}: {count} pairs")
+    if args.audit_jsonl:
+        audit_corpus.write_jsonl(args.audit_jsonl, audit["hits"] + audit["pairs"])
+    spelling = artifacts["spell"]["load"]()["summary"]
+    print(f"Spelling: {spelling['forms']} out-of-vocabulary forms "
+          f"({spelling['confidence']['high']} high, {spelling['confidence']['medium']} medium confidence)")
+
+    if not args.no_write:
+        with PROFILER.stage("write"):
+            changed = write_corpus(output_path, artifacts["themes"], state)
+            # The app bundles the insights of the curated corpus only
+            insights_changed = (output_path.resolve() == DATA_PATH.resolve()
+                                and insights.write_insights(insights.INSIGHTS_PATH, artifacts["insights"]["load"]()))
+        print(f"\nCorpus {'written to' if changed else 'unchanged:'} {output_path}")
+        if insights_changed:
+            print(f"Insights written to {insights.INSIGHTS_PATH}")
+    save_state(state)
+    print(f"Total: {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
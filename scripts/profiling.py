@@ -0,0 +1,186 @@
+"""Opt-in profiling for the corpus scripts.
+
+extract_meditations.py, fix_meditations.py, assign_themes.py, audit_corpus.py
+and pipeline.py accept --profile [PATH]; setting ESTOIC_PROFILE (to a report
+path, or to 1 for the default one) does the same without touching the
+command line. Profiling is off by default, and the hooks cost a flag check
+when it is. A profiled run records:
+
+- wall time, calls and tracemalloc peak of named stages; nested stages are
+  reported as "outer/inner" (e.g. "extract/book 3/clean_text");
+- calls, matches and cumulative time of every cleaning rule or check,
+  grouped by the function applying them ("chapter:...", "ocr:...",
+  "audit:...", "themes:...");
+- the peak traced memory of the whole run.
+
+With --profile-cprofile (or ESTOIC_PROFILE_CPROFILE=1) the run also goes
+through cProfile and the stats are dumped next to the report
+(<report>.pstats, for `python -m pstats`).
+
+Everything goes to one JSON report (.cache/profile/<script>.json by
+default), written when the script exits, with stages and rules sorted by
+time; the top entries are also printed to stderr. tracemalloc and cProfile
+slow the run down, so compare profiled runs with each other, not with
+unprofiled timings. With worker processes (--jobs > 1) only what runs in
+the main process is recorded.
+"""
+from __future__ import annotations
+
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import NamedTuple
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE_DIR = ROOT / ".cache" / "profile"
+
+ENV_VAR = "ESTOIC_PROFILE"
+CPROFILE_ENV_VAR = "ESTOIC_PROFILE_CPROFILE"
+REPORT_VERSION = 1
+SUMMARY_LIMIT = 8
+
+
+class RuleCounters(NamedTuple):
+    """Counters keyed by rule name, in the (hits, timings, calls) order the cleaning functions take."""
+    hits: Counter
+    timings: Counter
+    calls: Counter
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.script = None
+        self.path = None
+        self.started = None
+        self.cprofile = None
+        self.stages: dict[str, dict] = {}
+        self.groups: dict[str, RuleCounters] = {}
+        self._stack: list[list] = []
+        # Stand-in parent of the top-level stages, holding the run's peak
+        self._root = [None, 0]
+
+    def start(self, script: str, path: Path | None = None, cprofile: bool = False) -> None:
+        """Enable profiling for the rest of the process; the report is written at exit."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.script = script
+        self.path = path or PROFILE_DIR / f"{script}.json"
+        self.started = time.perf_counter()
+        tracemalloc.start()
+        if cprofile:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        atexit.register(self.finish)
+
+    def stage(self, name: str):
+        """Context manager timing a named stage (a no-op when profiling is off)."""
+        return self._stage(name) if self.enabled else contextlib.nullcontext()
+
+    @contextlib.contextmanager
+    def _stage(self, name: str):
+        path = "/".join([frame[0] for frame in self._stack] + [name])
+        # tracemalloc keeps a single peak: remember the enclosing one before
+        # resetting it, and hand this stage's peak back to the parent on exit
+        outer_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        frame = [name, 0]
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self._stack.pop()
+            peak = max(tracemalloc.get_traced_memory()[1], frame[1])
+            stats = self.stages.setdefault(path, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+            parent = self._stack[-1] if self._stack else self._root
+            parent[1] = max(parent[1], outer_peak, peak)
+
+    def rules(self, group: str) -> RuleCounters:
+        """The counters a cleaning function fills for one group of rules."""
+        if group not in self.groups:
+            self.groups[group] = RuleCounters(Counter(), Counter(), Counter())
+        return self.groups[group]
+
+    def report(self) -> dict:
+        rules = [
+            {"rule": f"{group}:{name}", "calls": counters.calls[name],
+             "hits": counters.hits[name], "seconds": round(counters.timings[name], 6)}
+            for group, counters in self.groups.items()
+            for name in sorted(set(counters.hits) | set(counters.timings) | set(counters.calls))
+        ]
+        stages = [
+            {"stage": name, "calls": stats["calls"], "seconds": round(stats["seconds"], 6),
+             "peak_bytes": stats["peak_bytes"]}
+            for name, stats in self.stages.items()
+        ]
+        return {
+            "version": REPORT_VERSION,
+            "script": self.script,
+            "argv": sys.argv,
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "peak_bytes": max(tracemalloc.get_traced_memory()[1], self._root[1]),
+            "stages": sorted(stages, key=lambda stage: -stage["seconds"]),
+            "rules": sorted(rules, key=lambda rule: (-rule["seconds"], -rule["calls"])),
+            "cprofile": str(self.path.with_suffix(".pstats")) if self.cprofile else None,
+        }
+
+    def finish(self) -> None:
+        """Write the report (and the cProfile stats), print the top entries and stop profiling."""
+        if not self.enabled:
+            return
+        if self.cprofile:
+            self.cprofile.disable()
+        report = self.report()
+        tracemalloc.stop()
+        self.enabled = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        if self.cprofile:
+            self.cprofile.dump_stats(report["cprofile"])
+        print_summary(report, self.path)
+
+
+def print_summary(report: dict, path: Path, limit: int = SUMMARY_LIMIT) -> None:
+    out = sys.stderr
+    print(f"\nProfile of {report['script']}: {report['seconds']:.2f}s, "
+          f"peak {report['peak_bytes'] / 1e6:.1f} MB -> {path}", file=out)
+    for stage in report["stages"][:limit]:
+        print(f"  {stage['seconds']:8.3f}s {stage['calls']:6d}x {stage['peak_bytes'] / 1e6:8.1f} MB  {stage['stage']}",
+              file=out)
+    for rule in report["rules"][:limit]:
+        print(f"  {rule['seconds']:8.3f}s {rule['calls']:6d}x {rule['hits']:8d} hits  {rule['rule']}", file=out)
+    if report["cprofile"]:
+        print(f"  cProfile stats: {report['cprofile']}", file=out)
+
+
+PROFILER = Profiler()
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help=f"write a profiling report (default: .cache/profile/<script>.json; or set {ENV_VAR})")
+    parser.add_argument("--profile-cprofile", action="store_true",
+                        help=f"with --profile, also dump cProfile stats next to the report (or set {CPROFILE_ENV_VAR}=1)")
+
+
+def start_from(args, script: str) -> None:
+    """Start profiling if --profile or ESTOIC_PROFILE asks for it."""
+    target = args.profile if args.profile is not None else os.environ.get(ENV_VAR)
+    if target is None or target.lower() in ("0", "false", "no"):
+        return
+    path = None if target.lower() in ("", "1", "true", "yes") else Path(target)
+    cprofile = args.profile_cprofile or os.environ.get(CPROFILE_ENV_VAR, "") not in ("", "0")
+    PROFILER.start(script, path, cprofile)
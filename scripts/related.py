@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Precomputed "related passages" graph for reading next.
+
+Every meditation becomes one sparse vector with two blocks:
+
+- TF-IDF over its search terms (search_index.terms: accent-folded, stopwords
+  removed, lightly stemmed), with sublinear TF, smoothed IDF and L2
+  normalisation, like assign_themes.batch_theme_scores;
+- its themes as an L2-normalised indicator vector.
+
+The blocks are scaled by sqrt(1 - THEME_WEIGHT) and sqrt(THEME_WEIGHT), so the
+dot product of two vectors is (1 - w) * text cosine + w * theme cosine. The
+similarities are computed as sparse matrix products over blocks of rows
+(BLOCK_ROWS x corpus at a time, never the full corpus x corpus matrix) and
+only the top k neighbours of each row are kept, so memory stays bounded on
+corpora of tens of thousands of passages.
+
+The artifact (public/data/related.json, written by build_public_data.py) is an
+adjacency list aligned with "ids": neighbours[i] are the ids related to
+ids[i], best first, and scores[i] their similarity in thousandths.
+
+Run directly to check the blocked top-k against a dense all-pairs
+computation, or to time it on a replicated corpus:
+
+    python scripts/related.py --check
+    python scripts/related.py --scale 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional: without them the related graph is not built
+    np = sparse = None
+
+from search_index import terms
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+
+RELATED_VERSION = 1
+TOP_K = 5
+THEME_WEIGHT = 0.25
+BLOCK_ROWS = 256
+SCORE_SCALE = 1000
+
+
+def l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return sparse.diags(1 / np.where(norms > 0, norms, 1)) @ matrix
+
+
+def tfidf_matrix(texts: list[str]):
+    """L2-normalised TF-IDF rows (texts x vocabulary)."""
+    vocabulary: dict[str, int] = {}
+    rows, cols, counts = [], [], []
+    for row, text in enumerate(texts):
+        term_counts: dict[int, int] = {}
+        for term in terms(text):
+            col = vocabulary.setdefault(term, len(vocabulary))
+            term_counts[col] = term_counts.get(col, 0) + 1
+        rows += [row] * len(term_counts)
+        cols += term_counts.keys()
+        counts += term_counts.values()
+    matrix = sparse.csr_matrix(
+        (np.array(counts, dtype=np.float64), (rows, cols)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + matrix.shape[0]) / (1 + doc_freq)) + 1
+    matrix.data = 1 + np.log(matrix.data)
+    return l2_normalize(matrix @ sparse.diags(idf))
+
+
+def theme_vectors(meditations: list[dict], theme_ids: list[str]):
+    """L2-normalised theme indicator rows (meditations x themes)."""
+    index = {theme: i for i, theme in enumerate(theme_ids)}
+    rows, cols = [], []
+    for row, meditation in enumerate(meditations):
+        for theme in meditation.get("themes", []):
+            rows.append(row)
+            cols.append(index.setdefault(theme, len(index)))
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(meditations), len(index)))
+    return l2_normalize(matrix)
+
+
+def passage_vectors(meditations: list[dict], theme_ids: list[str], theme_weight: float = THEME_WEIGHT):
+    return sparse.hstack([
+        np.sqrt(1 - theme_weight) * tfidf_matrix([m["text"] for m in meditations]),
+        np.sqrt(theme_weight) * theme_vectors(meditations, theme_ids),
+    ], format="csr", dtype=np.float32)
+
+
+def top_k_neighbours(vectors, k: int = TOP_K, block_rows: int = BLOCK_ROWS):
+    """(indices, scores) arrays of shape (rows x k), best first, for the blocked all-pairs product.
+
+    A passage is never its own neighbour; slots without a neighbour of
+    positive similarity hold index -1 and score 0.
+    """
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    indices = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k <= 0:
+        return indices, scores
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        # The block's similarities are mostly non-zero, so a sparse x dense
+        # product (corpus x block) is cheaper than building a sparse result
+        block = np.ascontiguousarray((vectors @ vectors[start:stop].T.toarray()).T)
+        block[np.arange(stop - start), np.arange(start, stop)] = -1
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        # Where the k-th best score is tied with passages outside the
+        # partition, take the lowest-index ties instead, so the result is the
+        # same as a stable sort of the whole row
+        threshold = candidate_scores.min(axis=1, keepdims=True)
+        ambiguous = np.flatnonzero(
+            (block == threshold).sum(axis=1) > (candidate_scores == threshold).sum(axis=1))
+        if len(ambiguous):
+            rows, row_threshold = block[ambiguous], threshold[ambiguous]
+            above = rows > row_threshold
+            ties = rows == row_threshold
+            ties &= np.cumsum(ties, axis=1) <= k - above.sum(axis=1, keepdims=True)
+            candidates[ambiguous] = np.nonzero(above | ties)[1].reshape(len(ambiguous), k)
+            candidate_scores[ambiguous] = np.take_along_axis(rows, candidates[ambiguous], axis=1)
+        # Best first, ties by lower index (the order of a stable sort)
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        positive = candidate_scores > 0
+        indices[start:stop] = np.where(positive, candidates, -1)
+        scores[start:stop] = np.where(positive, candidate_scores, 0)
+    return indices, scores
+
+
+def build_related(data: dict, k: int = TOP_K, theme_weight: float = THEME_WEIGHT,
+                  block_rows: int = BLOCK_ROWS) -> dict:
+    meditations = data["meditations"]
+    theme_ids = [theme["id"] for theme in data.get("themes", [])]
+    vectors = passage_vectors(meditations, theme_ids, theme_weight)
+    indices, scores = top_k_neighbours(vectors, k, block_rows)
+    ids = [m["id"] for m in meditations]
+    return {
+        "version": RELATED_VERSION,
+        "k": k,
+        "themeWeight": theme_weight,
+        "scoreScale": SCORE_SCALE,
+        "ids": ids,
+        "neighbours": [[ids[j] for j in row if j >= 0] for row in indices.tolist()],
+        "scores": [[round(s * SCORE_SCALE) for s, j in zip(row_scores, row) if j >= 0]
+                   for row_scores, row in zip(scores.tolist(), indices.tolist())],
+    }
+
+
+def dense_top_k(vectors, k: int):
+    """Reference: full dense similarity matrix and a stable sort per row."""
+    similarities = (vectors @ vectors.T).toarray()
+    np.fill_diagonal(similarities, -1)
+    order = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(similarities, order, axis=1)
+
+
+def check_related(data: dict, k: int) -> bool:
+    meditations = data["meditations"]
+    theme_ids = [theme["id"] for theme in data.get("themes", [])]
+    vectors = passage_vectors(meditations, theme_ids)
+    # A block size that doesn't divide the corpus, to cover the last partial block
+    indices, scores = top_k_neighbours(vectors, k, block_rows=97)
+    expected, expected_scores = dense_top_k(vectors, indices.shape[1])
+    expected = np.where(expected_scores > 0, expected, -1)
+    mismatched = np.flatnonzero((indices != expected).any(axis=1))
+    print(f"Blocked top-{indices.shape[1]} vs dense: {len(meditations) - len(mismatched)}/{len(meditations)} rows identical")
+    for row in mismatched[:10]:
+        print(f"  id={meditations[row]['id']}: blocked {indices[row].tolist()}, dense {expected[row].tolist()}")
+    return not len(mismatched)
+
+
+def scaled_corpus(data: dict, size: int) -> dict:
+    """`size` passages built from the corpus: copy c of row r is the text of r
+    followed by the text of row r + c, so copies are distinct passages
+    instead of exact duplicates (which would tie everywhere)."""
+    rows = data["meditations"]
+    meditations = []
+    for i in range(size):
+        copy, row = divmod(i, len(rows))
+        text = rows[row]["text"]
+        if copy:
+            text += " " + rows[(row + copy) % len(rows)]["text"]
+        meditations.append({**rows[row], "id": i, "text": text})
+    return {**data, "meditations": meditations}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the related-passages graph (top-k sparse similarity).")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON")
+    parser.add_argument("-k", type=int, default=TOP_K, help=f"neighbours per passage (default: {TOP_K})")
+    parser.add_argument("--check", action="store_true", help="compare with a dense all-pairs computation")
+    parser.add_argument("--scale", type=int, metavar="N", help="time the build on the corpus replicated to N passages")
+    parser.add_argument("--show", type=int, metavar="ID", help="print the passages related to meditation ID")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if np is None:
+        raise SystemExit("ERROR: related.py needs numpy and scipy (pip install numpy scipy)")
+    data = json.loads(args.data.read_text(encoding="utf-8"))
+    if args.scale:
+        data = scaled_corpus(data, args.scale)
+
+    started = time.perf_counter()
+    related = build_related(data, args.k)
+    elapsed = time.perf_counter() - started
+    size = len(json.dumps(related, separators=(",", ":")))
+    print(f"{len(related['ids'])} passages, top-{related['k']}: {elapsed:.2f}s, {size:,d} bytes")
+
+    if args.show is not None:
+        by_id = {m["id"]: m for m in data["meditations"]}
+        row = related["ids"].index(args.show)
+        print(f"\n{args.show}: {by_id[args.show]['text'][:120]}")
+        for neighbour, score in zip(related["neighbours"][row], related["scores"][row]):
+            print(f"  {score / SCORE_SCALE:.3f} id={neighbour}: {by_id[neighbour]['text'][:100]}")
+    if args.check:
+        return 0 if check_related(data, args.k) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Offline inverted index for searching the Meditations corpus.
+
+Terms are accent-folded like normalizeForSearch in src/utils/stoicLens.js
+(lowercase, NFD, combining marks removed, so "razón" -> "razon" and
+"ñ" -> "n"), Spanish function words are dropped and the rest are lightly
+stemmed: a plural ending and then a final gender vowel are removed, so
+"hombre", "hombres" and "hombría" do not all meet, but "virtud"/"virtudes" and
+"cosa"/"cosas" do.
+
+The index is a compact JSON artifact (built into public/data by
+build_public_data.py). Posting lists are flat [gap, tf, gap, tf, ...] arrays:
+gap is the difference from the previous meditation id (the first gap is the
+id itself) and tf the term frequency in that meditation. Stopwords and the
+stemming suffixes travel inside the artifact, so a client can normalise a
+query exactly the same way and intersect the posting lists of its terms.
+
+Run directly to query the index and compare it with a linear scan:
+
+    python scripts/search_index.py "ira enfado"
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import re
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+
+INDEX_VERSION = 1
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MIN_STEM = 3
+
+# Plural endings, tried in order; only the first that applies is removed.
+# ("es" only after a consonant: virtudes, razones; "s" only after a vowel.)
+PLURAL_SUFFIXES = ["es", "s"]
+GENDER_VOWELS = "aoe"
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aquel aquella aquello
+asi aun aunque cada como con contra cual cuales cuando de del desde donde dos
+e el ella ellas ello ellos en entre era eran es esa esas ese eso esos esta
+estas este esto estos fue fueron ha han hasta hay la las le les lo los mas me
+mi mis mismo muy nada ni no nos o os otra otras otro otros para pero poco por
+porque pues que quien se sea segun ser si sin sino sobre son su sus tal tambien
+tan tanto te ti tu tus u un una uno unos y ya yo
+""".split())
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, matching normalizeForSearch in stoicLens.js."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(term: str) -> str:
+    """Remove one plural ending and then a final gender vowel, keeping MIN_STEM letters."""
+    if term.isdigit():
+        return term
+    for suffix in PLURAL_SUFFIXES:
+        rest = term[:-len(suffix)]
+        if term.endswith(suffix) and len(rest) >= MIN_STEM and (
+                (suffix == "es") != (rest[-1] in "aeiou")):
+            term = rest
+            break
+    if term[-1] in GENDER_VOWELS and len(term) > MIN_STEM:
+        term = term[:-1]
+    return term
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def chunk_terms(chunk: str) -> tuple[str, ...]:
+    return tuple(stem(token) for token in TOKEN_RE.findall(fold(chunk)) if token not in STOPWORDS)
+
+
+def terms(text: str) -> list[str]:
+    """Indexable terms of a text or query, in order.
+
+    Tokens never span whitespace, so each whitespace-separated chunk is
+    folded and stemmed once (memoised) instead of folding the whole text.
+    """
+    return [term for chunk in text.split() for term in chunk_terms(chunk)]
+
+
+def build_search_index(meditations: list[dict]) -> dict:
+    postings: dict[str, list[int]] = {}
+    for meditation in sorted(meditations, key=lambda m: m["id"]):
+        for term, tf in Counter(terms(meditation["text"])).items():
+            entry = postings.setdefault(term, [0])
+            # entry[0] tracks the last id, so gaps can be appended directly
+            entry += [meditation["id"] - entry[0], tf]
+            entry[0] = meditation["id"]
+    return {
+        "version": INDEX_VERSION,
+        "docs": len(meditations),
+        "normalize": {
+            "fold": "NFD, lowercase, strip combining marks",
+            "token": TOKEN_RE.pattern,
+            "stopwords": sorted(STOPWORDS),
+            "pluralSuffixes": PLURAL_SUFFIXES,
+            "genderVowels": GENDER_VOWELS,
+            "minStem": MIN_STEM,
+        },
+        "postings": {term: postings[term][1:] for term in sorted(postings)},
+    }
+
+
+def decode_postings(flat: list[int]) -> dict[int, int]:
+    """{meditation id: tf} from a flat [gap, tf, ...] posting list."""
+    decoded = {}
+    current = 0
+    for i in range(0, len(flat), 2):
+        current += flat[i]
+        decoded[current] = flat[i + 1]
+    return decoded
+
+
+def search(index: dict, query: str) -> list[int]:
+    """Ids containing every query term, ranked by summed term frequency."""
+    query_terms = terms(query)
+    if not query_terms:
+        return []
+    lists = [decode_postings(index["postings"].get(term, [])) for term in dict.fromkeys(query_terms)]
+    lists.sort(key=len)
+    scores = dict(lists[0])
+    for postings in lists[1:]:
+        scores = {doc: tf + postings[doc] for doc, tf in scores.items() if doc in postings}
+    return sorted(scores, key=lambda doc: (-scores[doc], doc))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the inverted index and compare with a linear scan.")
+    parser.add_argument("query", help="search words; every term must match")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    meditations = json.loads(args.data.read_text(encoding="utf-8"))["meditations"]
+
+    started = time.perf_counter()
+    index = build_search_index(meditations)
+    build_seconds = time.perf_counter() - started
+    size = len(json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    print(f"Index: {len(index['postings'])} terms, {size:,d} bytes, built in {build_seconds * 1000:.1f} ms")
+    print(f"Query terms: {terms(args.query)}")
+
+    started = time.perf_counter()
+    ids = search(index, args.query)
+    index_seconds = time.perf_counter() - started
+
+    query_terms = set(terms(args.query))
+    started = time.perf_counter()
+    scanned = [m["id"] for m in meditations if query_terms <= set(terms(m["text"]))]
+    scan_seconds = time.perf_counter() - started
+
+    print(f"Index: {len(ids)} matches in {index_seconds * 1000:.3f} ms; "
+          f"linear scan: {len(scanned)} matches in {scan_seconds * 1000:.1f} ms")
+    if sorted(ids) != scanned:
+        print("WARNING: index and scan disagree")
+        return 1
+    print(f"Top ids: {ids[:10]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
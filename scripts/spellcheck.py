@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Dictionary-backed OCR error detector for the Meditations corpus.
+
+The vocabulary is built from the corpus itself (words seen at least
+MIN_WORD_COUNT times), the manually verified CORRECTIONS texts in
+fix_meditations.py and, optionally, word lists with one word per line
+(--wordlist, e.g. a Spanish list exported from a spelling dictionary).
+Corpus words containing an OCR_CONFUSIONS reading ("rn", "nn", "ii", "li",
+"cl", "φ"...) are only trusted when CORRECTIONS or a word list has them: a
+misreading the scan repeats on several pages is still a misreading.
+The vocabulary is indexed SymSpell-style: every word is stored under all the
+strings obtained by deleting up to MAX_DISTANCE characters from its first
+PREFIX_LENGTH characters. A token's candidates are then found by generating
+the same deletes for the token and looking them up in a dict, so a lookup
+costs a few dozen hash probes however large the vocabulary is; only those
+candidates are compared with an (optimal string alignment) edit distance.
+
+Every out-of-vocabulary token is reported with its best suggestion and a
+confidence:
+
+- high: undoing one OCR_CONFUSIONS reading gives a word of the corpus or the
+  vocabulary, and the reading can't be the other way round (exterionnente ->
+  exteriormente: "nn" is read for "rm", never "rm" for "nn"), or the
+  suggestion is one the vocabulary trusts;
+- medium: the same, but through a reading that also happens in reverse
+  ("m" is read for "rn" as often as "rn" for "m"), so the suggestion may be
+  the error. On the curated corpus both medium flags are correct words
+  (darnos -> damos, externa -> extema, "extema" being the misreading), while
+  all 12 high flags it raised were real errors, now fixed by the spell_*
+  rules of ocr_rules.json;
+- low: anything else: the closest, then most frequent, vocabulary word that
+  is at least MIN_SUGGESTION_COUNT times more frequent than the token, or no
+  suggestion. On the curated corpus these are nearly all rare but correct
+  words (afecto -> efecto, fuerte -> muerte).
+
+The report shows the high flags; --all adds the medium and low ones. Flags are
+candidates for review, not automatic fixes: --emit-rules prints the
+high-confidence ones (all of them with --all) as whole-word rules to paste
+into ocr_rules.json, which is where fixes live. The pipeline runs the
+detector as its "spell" stage.
+
+To check a fresh extraction against the curated corpus:
+
+    python scripts/spellcheck.py --data extracted.json --vocabulary src/data/meditations.json
+
+    python scripts/spellcheck.py
+    python scripts/spellcheck.py --check          # brute-force scan and known cases
+    python scripts/spellcheck.py --emit-rules
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = ROOT / "src" / "data" / "meditations.json"
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_WORD_COUNT = 2
+MIN_TOKEN_LENGTH = 4
+# A suggestion must be this many times more frequent than the token
+MIN_SUGGESTION_COUNT = 3
+CONFIDENCE = ("high", "medium", "low")
+
+# (read by the OCR, actual text): the usual glyph confusions of this scan
+OCR_CONFUSIONS = [
+    ("rn", "m"), ("nn", "m"), ("nn", "rm"), ("rñ", "m"), ("ii", "u"), ("li", "h"),
+    ("cl", "d"), ("φ", "r"), ("φ", "rp"),
+]
+# Verdicts --check pins, from misreadings of the curated corpus: (token, suggestion, confidence)
+KNOWN_FLAGS = [
+    ("exterionnente", "exteriormente", "high"),
+    ("externa", "extema", "medium"),
+]
+
+
+def deletes(word: str, max_distance: int = MAX_DISTANCE, prefix_length: int = PREFIX_LENGTH) -> set[str]:
+    """The word's prefix and every string made by deleting up to max_distance of its characters."""
+    found = {word[:prefix_length]}
+    frontier = found
+    for _ in range(max_distance):
+        frontier = {edit[:i] + edit[i + 1:] for edit in frontier for i in range(len(edit))}
+        found |= frontier
+    return found
+
+
+def common_prefix(first: str, second: str) -> int:
+    size = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        size += 1
+    return size
+
+
+def edit_distance(first: str, second: str, limit: int = MAX_DISTANCE) -> int:
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit."""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    # A common prefix or suffix never changes the distance; candidates from
+    # the delete index usually share most of the word, leaving a tiny table
+    start = common_prefix(first, second)
+    first, second = first[start:], second[start:]
+    end = common_prefix(first[::-1], second[::-1])
+    if end:
+        first, second = first[:-end], second[:-end]
+    if not first or not second:
+        return min(len(first) + len(second), limit + 1)
+    # Only cells within `limit` of the diagonal can stay within the limit
+    over = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(second) + 1)]
+    for i, a in enumerate(first, 1):
+        low, high = max(1, i - limit), min(len(second), i + limit)
+        current = [over] * (len(second) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(low, high + 1):
+            b = second[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if i > 1 and j > 1 and a == second[j - 2] and first[i - 2] == b:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+def tokens(text: str) -> list[re.Match]:
+    return list(WORD_RE.finditer(text))
+
+
+class SymSpell:
+    """Symmetric-delete index over a {word: count} vocabulary.
+
+    trusted holds the words vouched for by CORRECTIONS or a word list, and
+    corpus the counts of every word of the corpus, trusted or not.
+    """
+
+    def __init__(self, counts: dict[str, int], max_distance: int = MAX_DISTANCE,
+                 prefix_length: int = PREFIX_LENGTH, trusted: set[str] = frozenset(),
+                 corpus: dict[str, int] | None = None):
+        self.counts = counts
+        self.trusted = trusted
+        self.corpus = counts if corpus is None else corpus
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.index: dict[str, list[str]] = {}
+        for word in counts:
+            for delete in deletes(word, max_distance, prefix_length):
+                self.index.setdefault(delete, []).append(word)
+
+    def candidates(self, token: str) -> set[str]:
+        return {
+            word
+            for delete in deletes(token, self.max_distance, self.prefix_length)
+            for word in self.index.get(delete, ())
+        }
+
+    def lookup(self, token: str, min_count: int = 0) -> list[tuple[str, int, int]]:
+        """[(word, distance, count)] within max_distance and seen at least min_count
+        times, closest and most frequent first."""
+        matches = []
+        for word in self.candidates(token):
+            if self.counts[word] < min_count:
+                continue
+            distance = edit_distance(token, word, self.max_distance)
+            if distance <= self.max_distance:
+                matches.append((word, distance, self.counts[word]))
+        return sorted(matches, key=lambda match: (match[1], -match[2], match[0]))
+
+
+def load_wordlist(path: Path) -> set[str]:
+    return {line.strip().lower() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+
+def token_counts(meditations: list[dict]) -> Counter:
+    return Counter(match.group().lower() for m in meditations for match in tokens(m["text"]))
+
+
+def has_reading(word: str) -> bool:
+    """True if word contains a glyph sequence the OCR reads for something else."""
+    return any(read in word for read, _ in OCR_CONFUSIONS)
+
+
+def trusted_words(wordlists: list[Path] = ()) -> set[str]:
+    """Words of the CORRECTIONS texts and the word lists."""
+    from fix_meditations import CORRECTIONS
+
+    trusted = {match.group().lower() for text in CORRECTIONS.values() for match in tokens(text)}
+    for path in wordlists:
+        trusted |= load_wordlist(path)
+    return trusted
+
+
+def build_vocabulary(meditations: list[dict], wordlists: list[Path] = ()) -> dict[str, int]:
+    """Trusted vocabulary {word: count}: recurring corpus words without an OCR reading,
+    CORRECTIONS and word lists."""
+    corpus = token_counts(meditations)
+    vocabulary = {
+        word: count for word, count in corpus.items()
+        if count >= MIN_WORD_COUNT and not has_reading(word)
+    }
+    for word in trusted_words(wordlists):
+        vocabulary[word] = max(vocabulary.get(word, 0), corpus.get(word, 1))
+    return vocabulary
+
+
+def build_speller(meditations: list[dict], wordlists: list[Path] = ()) -> SymSpell:
+    """SymSpell over build_vocabulary, knowing the trusted words and the corpus counts."""
+    return SymSpell(build_vocabulary(meditations, wordlists), trusted=trusted_words(wordlists),
+                    corpus=token_counts(meditations))
+
+
+def confusion_fixes(token: str) -> list[tuple[str, bool]]:
+    """(word, reversible) for every word obtained by undoing one OCR_CONFUSIONS reading in token.
+
+    A reading is reversible when its actual text is a single glyph the scan
+    also splits the other way ("m" read as "rn" and "rn" merged into "m"),
+    so the token may be the correct word and the fix the misreading.
+    """
+    fixes = []
+    for read, actual in OCR_CONFUSIONS:
+        start = token.find(read)
+        while start >= 0:
+            fixes.append((token[:start] + actual + token[start + len(read):], len(actual) < len(read)))
+            start = token.find(read, start + 1)
+    return fixes
+
+
+def ocr_confusion(token: str, word: str) -> bool:
+    """True if replacing one OCR_CONFUSIONS reading in token gives word."""
+    return any(fix == word for fix, _ in confusion_fixes(token))
+
+
+def classify(token: str, count: int, speller: SymSpell) -> dict:
+    """Suggestion and confidence for one out-of-vocabulary token (lowercase) seen count times."""
+    # A confusion fix only has to exist somewhere in the corpus: the reading
+    # is the evidence, and the right spelling may well be rarer than the error
+    fixes = [
+        (word in speller.trusted, not reversible, speller.corpus.get(word, 0), word)
+        for word, reversible in confusion_fixes(token)
+        if word in speller.counts or speller.corpus.get(word, 0)
+    ]
+    if fixes:
+        trusted, one_way, _, word = max(fixes)
+        confidence = "high" if trusted or one_way else "medium"
+        return {"suggestion": word, "distance": edit_distance(token, word), "confidence": confidence}
+    matches = speller.lookup(token, MIN_SUGGESTION_COUNT * count)
+    if not matches:
+        return {"suggestion": None, "distance": None, "confidence": "low"}
+    word, distance, _ = matches[0]
+    return {"suggestion": word, "distance": distance, "confidence": "low"}
+
+
+def detect(meditations: list[dict], speller: SymSpell) -> list[dict]:
+    """One record per out-of-vocabulary token form: suggestion, confidence and every occurrence."""
+    counts = token_counts(meditations)
+    verdicts: dict[str, dict] = {}
+    flags: dict[str, dict] = {}
+    for meditation in meditations:
+        for match in tokens(meditation["text"]):
+            token = match.group()
+            word = token.lower()
+            if word in speller.counts or len(word) < MIN_TOKEN_LENGTH:
+                continue
+            if word not in verdicts:
+                verdicts[word] = classify(word, counts[word], speller)
+            flag = flags.setdefault(token, {"token": token, **verdicts[word], "occurrences": []})
+            flag["occurrences"].append({"id": meditation["id"], "span": [match.start(), match.end()]})
+    return sorted(flags.values(), key=lambda flag: (CONFIDENCE.index(flag["confidence"]), flag["token"].lower()))
+
+
+def summarize(flags: list[dict]) -> dict:
+    return {
+        "forms": len(flags),
+        "occurrences": sum(len(flag["occurrences"]) for flag in flags),
+        "confidence": {level: sum(1 for flag in flags if flag["confidence"] == level) for level in CONFIDENCE},
+    }
+
+
+def match_case(token: str, word: str) -> str:
+    if token.isupper() and len(token) > 1:
+        return word.upper()
+    return word[:1].upper() + word[1:] if token[:1].isupper() else word
+
+
+def rule_for(flag: dict) -> dict:
+    """A whole-word rule in the ocr_rules.json format for a flagged token."""
+    return {
+        "name": f"spell_{flag['token']}",
+        "kind": "sub",
+        "pattern": rf"\b{re.escape(flag['token'])}\b",
+        "replacement": match_case(flag["token"], flag["suggestion"]),
+    }
+
+
+def brute_force_lookup(token: str, counts: dict[str, int]) -> list[tuple[str, int, int]]:
+    matches = [(word, edit_distance(token, word), count) for word, count in counts.items()]
+    return sorted((m for m in matches if m[1] <= MAX_DISTANCE), key=lambda m: (m[1], -m[2], m[0]))
+
+
+def check_lookups(speller: SymSpell, meditations: list[dict]) -> bool:
+    """Compare the delete index with a scan of the whole vocabulary for every out-of-vocabulary token."""
+    words = [word for word in token_counts(meditations) if word not in speller.counts]
+    mismatches = [word for word in words if speller.lookup(word) != brute_force_lookup(word, speller.counts)]
+    print(f"{len(words) - len(mismatches)}/{len(words)} out-of-vocabulary lookups identical to a brute-force scan")
+    for word in mismatches[:10]:
+        print(f"  {word}: index {speller.lookup(word)[:3]}, scan {brute_force_lookup(word, speller.counts)[:3]}")
+    return not mismatches
+
+
+def check_known(speller: SymSpell) -> bool:
+    """Check the verdict of every KNOWN_FLAGS token, whether or not the scanned corpus still has it."""
+    wrong = []
+    for token, suggestion, confidence in KNOWN_FLAGS:
+        verdict = classify(token, 1, speller)
+        if (verdict["suggestion"], verdict["confidence"]) != (suggestion, confidence):
+            wrong.append(f"  {token}: expected {suggestion} ({confidence}), got "
+                         f"{verdict['suggestion']} ({verdict['confidence']})")
+    print(f"{len(KNOWN_FLAGS) - len(wrong)}/{len(KNOWN_FLAGS)} known flags as expected")
+    for line in wrong:
+        print(line)
+    return not wrong
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Flag likely OCR errors with a symmetric-delete dictionary index.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="corpus JSON to scan")
+    parser.add_argument("--vocabulary", type=Path,
+                        help="corpus JSON to build the vocabulary from (default: --data), e.g. to scan a fresh extraction")
+    parser.add_argument("--wordlist", type=Path, action="append", default=[],
+                        help="extra trusted words, one per line (repeatable)")
+    parser.add_argument("--all", action="store_true",
+                        help="also list medium- and low-confidence flags (and emit every rule)")
+    parser.add_argument("--jsonl", type=Path, help="write one JSON record per flagged token form (all confidences)")
+    parser.add_argument("--emit-rules", action="store_true",
+                        help="print the high-confidence flags as ocr_rules.json whole-word rules")
+    parser.add_argument("--check", action="store_true",
+                        help="compare every lookup with a brute-force scan and check the KNOWN_FLAGS verdicts")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    meditations = json.loads(args.data.read_text(encoding="utf-8"))["meditations"]
+    source = meditations
+    if args.vocabulary:
+        source = json.loads(args.vocabulary.read_text(encoding="utf-8"))["meditations"]
+
+    started = time.perf_counter()
+    speller = build_speller(source, args.wordlist)
+    built = time.perf_counter()
+    flags = detect(meditations, speller)
+    scanned = time.perf_counter()
+
+    summary = summarize(flags)
+    print(f"Vocabulary: {len(speller.counts):,d} words, {len(speller.index):,d} deletes "
+          f"(built in {(built - started) * 1000:.0f} ms)")
+    print(f"Scan: {summary['forms']} out-of-vocabulary forms ({summary['occurrences']} occurrences) "
+          f"in {(scanned - built) * 1000:.0f} ms; " +
+          ", ".join(f"{level} {count}" for level, count in summary["confidence"].items()) + "\n")
+    shown = [flag for flag in flags if args.all or flag["confidence"] == "high"]
+    if args.emit_rules:
+        rules = [rule_for(flag) for flag in flags if flag["suggestion"] and (args.all or flag["confidence"] == "high")]
+        print(json.dumps(rules, ensure_ascii=False, indent=2))
+    else:
+        for flag in shown:
+            ids = sorted({occurrence["id"] for occurrence in flag["occurrences"]})
+            print(f"{flag['confidence']:6s} {flag['token']} -> {flag['suggestion'] or '?'}  "
+                  f"(ids {', '.join(map(str, ids[:8]))}{' ...' if len(ids) > 8 else ''})")
+    if args.jsonl:
+        with args.jsonl.open("w", encoding="utf-8") as fh:
+            for flag in flags:
+                fh.write(json.dumps(flag, ensure_ascii=False) + "\n")
+    if args.check:
+        identical = check_lookups(speller, meditations)
+        return 0 if check_known(speller) and identical else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import BookContext from './BookContext';
 import Icon from './Icon';
-import { buildStoicInsight, cleanMeditationText } from '../utils/stoicLens';
+import { getStoicInsight } from '../utils/stoicLens';
 import { themeIconNames } from '../utils/themeIcons';
 
 export default function MeditationCard({
@@ -18,8 +18,8 @@ export default function MeditationCard({
   const [expanded, setExpanded] = useState(isDaily);
   const [fullTextOpen, setFullTextOpen] = useState(isDaily);
   const meditationThemes = themes.filter(t => meditation.themes.includes(t.id));
-  const displayText = cleanMeditationText(meditation.text);
-  const insight = buildStoicInsight(meditation);
+  const displayText = meditation.text;
+  const insight = getStoicInsight(meditation);
 
   const shareText = `"${displayText}" — Marco Aurelio, Libro ${meditation.book}, ${meditation.chapter}`;
   const shouldClampText = !isDaily && displayText.length > 760;